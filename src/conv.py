@@ -9,7 +9,7 @@ import dataclasses as dc
 
 import numpy as np
 
-from util import check_class_hints
+from util import check_class_hints, compile_expr
 from object_info import ObjectInfo
 
 # https://cs231n.github.io/convolutional-networks/
@@ -87,9 +87,10 @@ class Conv2DParams:
     o: Conv2DOutParams
 
     def get_out_params(self):
-        ow = eval("(i.w - f.w + 2*p) // s + 1", self.__dict__)
-        oh = eval("(i.h - f.h + 2*p) // s + 1", self.__dict__)
-        od = eval("f.l", self.__dict__)
+        (i, f, p, s) = (self.i, self.f, self.p, self.s)
+        ow = (i.w - f.w + 2 * p) // s + 1
+        oh = (i.h - f.h + 2 * p) // s + 1
+        od = f.l
         return Conv2DOutParams(w=ow, h=oh, d=od)
 
     def __init__(
@@ -118,6 +119,10 @@ class Conv2DParams:
         """ Get the shape of the filters as a (L,D,H,W) tuple """
         return (self.f.l, self.f.d, self.f.h, self.f.w)
 
+    def get_filters_m_shape(self):
+        """ Get the shape of the filters matrix (for MxV) as a (L,D*H*W) tuple """
+        return (self.f.l, self.f.d * self.f.h * self.f.w)
+
     def get_input_padding(self):
         """ Return something that can be passed to numpy.pad() """
         return ((0, 0), (self.p, self.p), (self.p, self.p))
@@ -151,7 +156,7 @@ class Conv2DParams:
         return (self.o.d, self.o.h + ph, self.o.w + pw)
 
     def eval(self, e):
-        return eval(e, self.__dict__)
+        return eval(compile_expr(e), self.__dict__)
 
 
 def conv2d_simple(image, filters, conv_params):
@@ -169,7 +174,7 @@ def conv2d_simple(image, filters, conv_params):
         % (image.shape, conv_params.get_filters_shape())
     )
 
-    output_shape = conv_params.eval("o.d, o.h, o.w")
+    output_shape = (conv_params.o.d, conv_params.o.h, conv_params.o.w)
     output = np.ndarray(output_shape)
     for od in range(conv_params.o.d):
         for oh in range(conv_params.o.h):
@@ -198,7 +203,7 @@ def conv2d_simple(image, filters, conv_params):
 
 def conv2d_mxv(image, filters, conv_params):
     # reshape the filters so that we can use MxV
-    filters_m = filters.reshape(conv_params.eval("(f.l, f.d*f.h*f.w)"))
+    filters_m = filters.reshape(conv_params.get_filters_m_shape())
     output_shape = conv_params.get_output_shape()
     output = np.ndarray(output_shape)
     for oh in range(conv_params.o.h):
@@ -208,7 +213,7 @@ def conv2d_mxv(image, filters, conv_params):
             image_block = image[
                 :, ih : ih + conv_params.f.h, iw : iw + conv_params.f.w
             ]
-            image_v = image_block.reshape(conv_params.eval("(f.d*f.h*f.w)"))
+            image_v = image_block.reshape(conv_params.get_filters_m_shape()[1])
             res = np.matmul(filters_m, image_v)
             # print("m=", filters_m.shape, "v=", image_v.shape)
 
@@ -270,7 +275,7 @@ class Conv1DParams:
     o: Conv1DOutParams
 
     def eval(self, e):
-        return eval(e, self.__dict__)
+        return eval(compile_expr(e), self.__dict__)
 
     def __init__(
         self,
@@ -294,14 +299,19 @@ class Conv1DParams:
             )
 
     def get_out_params(self):
-        ow = eval("(i.w - f.w + 2*p) // s + 1", self.__dict__)
-        od = eval("f.l", self.__dict__)
+        (i, f, p, s) = (self.i, self.f, self.p, self.s)
+        ow = (i.w - f.w + 2 * p) // s + 1
+        od = f.l
         return Conv1DOutParams(w=ow, d=od)
 
     def get_filters_shape(self):
         """ Get the shape of the filters as a (L,D,W) tuple """
         return (self.f.l, self.f.d, self.f.w)
 
+    def get_filters_m_shape(self):
+        """ Get the shape of the filters matrix (for MxV) as a (L,D*W) tuple """
+        return (self.f.l, self.f.d * self.f.w)
+
     def get_input_padding(self):
         """ Return something that can be passed to numpy.pad() """
         return ((0, 0), (self.p, self.p))
@@ -328,7 +338,7 @@ class Conv1DParams:
 
 
 def conv1d_simple(image, filters, params: Conv1DParams):
-    output_shape = params.eval("o.d, o.w")
+    output_shape = (params.o.d, params.o.w)
     output = np.ndarray(output_shape)
     for od in range(params.o.d):
         for ow in range(params.o.w):
@@ -8,6 +8,7 @@
 import typing
 import ast as pyast
 
+import numpy as np
 import islpy as isl
 
 # import ast as pyast
@@ -35,6 +36,34 @@ def isl_fix_params(x, vals):
     return ret
 
 
+def isl_map_to_table(isl_m, param_vals=None) -> np.ndarray:
+    """ Enumerate a (bounded) ISL map into an integer table
+
+    Parameters are fixed according to the @param_vals dict (if given).
+
+    Returns an (N, nin + nout) array, where every row contains the domain and
+    the range of a pair in the map. Rows are sorted lexicographically, i.e.,
+    in the same order code generated for the map would visit them.
+    """
+    if param_vals is not None:
+        isl_m = isl_fix_params(isl_m, param_vals)
+    n = sum(isl_m.space.dim(x) for x in (isl.dim_type.in_, isl.dim_type.out))
+    rows = []
+
+    def add_row(p):
+        rows.append(
+            [
+                p.get_coordinate_val(isl.dim_type.set, i).to_python()
+                for i in range(n)
+            ]
+        )
+
+    isl_m.wrap().foreach_point(add_row)
+    ret = np.array(rows, dtype=np.int64).reshape(len(rows), n)
+    # NB: np.lexsort() uses the last key as the primary one
+    return ret[np.lexsort(ret.T[::-1])]
+
+
 def str_to_isl_map(x: str) -> isl.Map:
     try:
         return isl.Map(x)
@@ -390,6 +419,7 @@ def isl2py_fn(node, fn_name):
     return pyast.FunctionDef(
         name=fn_name,
         args=pyast.arguments(
+            posonlyargs=[],
             args=[],
             defaults=[],
             vararg=None,
@@ -7,6 +7,8 @@
 import dataclasses as dc
 import typing
 
+import numpy as np
+
 from util import check_class_hints
 
 
@@ -15,9 +17,14 @@ class ObjectInfo:
     shape: typing.Tuple[int, ...]  # (unpadded) shape
     # NB: padding is something that can be passed to np.pad
     padding: typing.Optional[typing.Tuple[typing.Tuple[int, int], ...]]
+    # dtype of the buffers allocated for the object. The default matches the
+    # reference implementations (e.g., conv.conv2d_simple); np.float32 halves
+    # the memory footprint and traffic.
+    dtype: np.dtype
 
-    def __init__(self, shape, padding=None):
+    def __init__(self, shape, padding=None, dtype=np.float64):
         self.shape = shape
+        self.dtype = np.dtype(dtype)
         if padding is None:
             padding = tuple((0, 0) for _ in self.shape)
         elif isinstance(padding, int):
@@ -32,6 +39,9 @@ class ObjectInfo:
             x + p_s + p_e for (x, (p_s, p_e)) in zip(self.shape, self.padding)
         )
 
+    def is_padded(self) -> bool:
+        return any(p_s != 0 or p_e != 0 for (p_s, p_e) in self.padding)
+
     def get_unpadded_slice(self, np_arr):
         """ Given whatever padding this object has, return a non-padded slice """
         assert np_arr.shape == self.get_padded_shape()
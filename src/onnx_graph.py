@@ -291,7 +291,7 @@ class OnnxGraph:
 
             part.core_conf = pl.CoreConf(
                 np.array(init_tvs[weights_name].float_data).reshape(
-                    part.conv_ps.eval("(f.l, f.d*f.h*f.w)")
+                    part.conv_ps.get_filters_m_shape()
                 )
             )
 
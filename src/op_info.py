@@ -5,12 +5,13 @@
 # vim: set expandtab softtabstop=4 tabstop=4 shiftwidth=4 nowrap:
 
 import typing
+import functools
 import dataclasses as dc
 import islpy as isl
 
 import conv
 import pipeline as pl
-from isl_utils import isl_set_from_names, isl_set_from_shape
+from isl_utils import isl_set_from_names, isl_set_from_shape, isl_fix_params
 
 """ Polyhedral information for operations """
 
@@ -56,6 +57,30 @@ class IslAccess:
         """ Write ISL access """
         return IslAccess("WR", acc)
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def template(acc: str) -> isl.Map:
+        """ Parse a (parametric) access relation string once
+
+        The result can be passed as is to RD/WR (and the parameter values to
+        the Stage), or specialized first via specialize().
+        """
+        return isl.Map(acc)
+
+    @staticmethod
+    def specialize(tmpl: isl.Map, param_vals) -> isl.Map:
+        """ Fix the parameters of @tmpl that appear in @param_vals
+
+        The fixed parameters are projected out, so the result is the same as
+        parsing the relation with the values in place of the parameters.
+        """
+        ret = isl_fix_params(tmpl, param_vals)
+        for name in param_vals:
+            pos = ret.find_dim_by_name(isl.dim_type.param, name)
+            if pos != -1:
+                ret = ret.project_out(isl.dim_type.param, pos, 1)
+        return ret
+
     def get_stage_name(self) -> str:
         return self.access.get_tuple_name(isl.dim_type.in_)
 
@@ -24,21 +24,26 @@ The pipeline consists of stages that are executed on cores.
 """
 
 import itertools
+import functools
+import logging
+import math
+import copy
 import typing
 import types
 import dataclasses as dc
 import ast as pyast
 import pprint as pp
-from collections import deque, defaultdict
+import threading
+import concurrent.futures as cf
+from collections import deque, defaultdict, Counter
 
 import numpy as np
-import astor as pyastor
 
 import islpy as isl
 
 from op_info import OpInfo, IslAccess
 from object_info import ObjectInfo
-from pyast_utils import StructureTupleYields
+from pyast_utils import StructureTupleYields, ast_to_source
 from util import check_class_hints
 from isl_utils import (
     isl2py_fn,
@@ -47,8 +52,13 @@ from isl_utils import (
     isl_set_from_names,
     isl_set_from_shape,
     isl_fix_params,
+    isl_map_to_table,
 )
 
+# Debug messages on the execution path go through this logger. Arguments are
+# formatted lazily, so they cost little when DEBUG is disabled.
+_LOG = logging.getLogger(__name__)
+
 
 @dc.dataclass(init=False)
 class StageInfo:
@@ -77,6 +87,10 @@ class StageInfo:
     ro_objs: typing.Set[str]  # Objects that this stage reads (external)
     wo_objs: typing.Set[str]  # Objects that this stage writes (external)
     rw_objs: typing.Set[str]  # Objects that this stage writes and reads (internal)
+    rd_rels: typing.Dict[str, isl.Map]  # object -> read access relation
+    wr_rels: typing.Dict[str, isl.Map]  # object -> write access relation
+
+    __slots__ = ("ops", "ro_objs", "wo_objs", "rw_objs", "rd_rels", "wr_rels")
 
     def __init__(self, ops: typing.List[OpInfo]):
         if len(ops) == 0:
@@ -96,50 +110,57 @@ class StageInfo:
         domain = self.get_domain()
         assert all((o.get_domain() == domain for o in ops))
 
-        self.ro_objs = set()
-        self.wo_objs = set()
-        self.rw_objs = set()
+        # Accesses of all operations, in order: (op_id, op, a_ty, objname)
+        accs = [
+            (op_id, op, acc.a_ty, acc.get_obj_name())
+            for (op_id, op) in enumerate(self.ops)
+            for acc in op.accesses
+        ]
+        # position of the first read/write access for every object
+        rev_accs = list(enumerate(accs))[::-1]
+        first_rd = dict((o, i) for (i, (_, _, ty, o)) in rev_accs if ty == "RD")
+        first_wr = dict((o, i) for (i, (_, _, ty, o)) in rev_accs if ty == "WR")
+
+        # sanity checks
+        wr_cnt = Counter(o for (_, _, ty, o) in accs if ty == "WR")
+        for (objname, cnt) in wr_cnt.items():
+            if cnt > 1:
+                (op_id, op, _, _) = [
+                    a for a in accs if a[2] == "WR" and a[3] == objname
+                ][1]
+                raise ValueError(
+                    "Object %s written in op %s (id:%d) but also written previously"
+                    % (objname, op.op_ty, op_id)
+                )
+        for (objname, wr_i) in first_wr.items():
+            if first_rd.get(objname, wr_i) < wr_i:
+                (op_id, op, _, _) = accs[wr_i]
+                raise ValueError(
+                    "Object %s written in op %s (id:%d) previously read"
+                    % (objname, op.op_ty, op_id)
+                )
 
-        # process object dependencies, do sanity checks, and create object sets
-        for (op_id, op) in enumerate(self.ops):
-            for acc in op.accesses:
+        # Objects that are written before they are read are internal (rw).
+        rd = set(first_rd)
+        wr = set(first_wr)
+        self.ro_objs = rd - wr
+        self.wo_objs = wr - rd
+        self.rw_objs = rd & wr
+
+        # Access relations for every object. Multiple read accesses for an
+        # object are combined into a single relation.
+        self.rd_rels = {}
+        self.wr_rels = {}
+        for op in self.ops:
+            for acc in op.rd_accesses():
                 objname = acc.get_obj_name()
-                if acc.a_ty == "RD":
-                    if (
-                        objname in self.wo_objs
-                    ):  # Object was previously written, no read. Move it to rw
-                        self.wo_objs.remove(objname)
-                        self.rw_objs.add(objname)
-                    elif (
-                        objname in self.ro_objs
-                    ):  # Object was previously read, do nothing
-                        pass
-                    elif (
-                        objname in self.rw_objs
-                    ):  # Object was previously written and read, do nothing
-                        pass
-                    else:  # First time seeing this object, put it into ro set
-                        self.ro_objs.add(objname)
-                elif acc.a_ty == "WR":
-                    if objname in self.wo_objs:
-                        # Object was previously written, error
-                        raise ValueError(
-                            "Object %s written in op %s (id:%d) but also written previously"
-                            % (objname, op.op_ty, op_id)
-                        )
-                    if objname in self.ro_objs:
-                        raise ValueError(
-                            "Object %s written in op %s (id:%d) previously read"
-                            % (objname, op.op_ty, op_id)
-                        )
-                    if objname in self.ro_objs:
-                        raise ValueError(
-                            "Object %s written in op %s (id:%d) previously write and read"
-                            % (objname, op.op_ty, op_id)
-                        )
-                    self.wo_objs.add(objname)
+                if objname in self.rd_rels:
+                    rel = self.rd_rels[objname].union(acc.access)
                 else:
-                    ValueError("Unknown access type: %s" % (acc.a_ty,))
+                    rel = acc.access
+                self.rd_rels[objname] = rel
+            for acc in op.wr_accesses():
+                self.wr_rels[acc.get_obj_name()] = acc.access
 
     def get_stage_name(self) -> str:
         return self.ops[0].get_stage_name()
@@ -153,18 +174,7 @@ class StageInfo:
                 "stage %s does not read from object %s"
                 % (self.get_stage_name(), objname)
             )
-        accs = []
-        for op in self.ops:
-            accs.extend(
-                a for a in op.rd_accesses() if a.get_obj_name() == objname
-            )
-        acc0 = accs[0]
-        if len(accs) > 1:
-            # Combine multiple read accesses for an object
-            for acc in accs[1:]:
-                acc0.access = acc0.access.union(acc.access)
-
-        return acc0.access
+        return self.rd_rels[objname]
 
     def get_obj_wr_rel(self, objname: str) -> isl.Map:
         if objname not in self.wo_objs:
@@ -172,13 +182,7 @@ class StageInfo:
                 "stage %s does not write to object %s"
                 % (self.get_stage_name(), objname)
             )
-        accs = []
-        for op in self.ops:
-            accs.extend(
-                a for a in op.wr_accesses() if a.get_obj_name() == objname
-            )
-        assert len(accs) == 1, "Multiple writes on the same object not allowed"
-        return accs[0].access
+        return self.wr_rels[objname]
 
     def get_obj_last_loc(self, objname: str, param_vals) -> isl.Map:
         if objname not in self.wo_objs:
@@ -186,13 +190,7 @@ class StageInfo:
                 "stage %s does not write to object %s"
                 % (self.get_stage_name(), objname)
             )
-        accs = []
-        for op in self.ops:
-            accs.extend(
-                a for a in op.wr_accesses() if a.get_obj_name() == objname
-            )
-        assert len(accs) == 1, "Multiple writes on the same object not allowed"
-        acc = accs[0].access
+        acc = self.wr_rels[objname]
         last_loc = isl_fix_params(acc.domain().lexmax(), param_vals)
         ps = []
         last_loc.foreach_point(ps.append)
@@ -204,10 +202,22 @@ class StageInfo:
         return loc
 
 
-def isl_map_to_pyfn(rel, fnname, s=None):
-    """ Transform an isl map to a python function """
+@functools.lru_cache(maxsize=None)
+def structure_tuple_yields(s: typing.Tuple[int, ...]) -> StructureTupleYields:
+    """ Return a (shared) StructureTupleYields transformer for structure @s """
+    return StructureTupleYields(s)
+
+
+@functools.lru_cache(maxsize=None)
+def isl_map_to_pyfn_cached(rel_str: str, s: typing.Tuple[int, int]):
+    """ Generate a python function for an isl map given in string form
+
+    The result is shared across callers, so it should not be modified. Use
+    isl_map_to_pyfn() to get a private copy.
+    """
+    rel = isl.Map(rel_str)
     ast = isl_map_to_ast(rel)
-    py = isl2py_fn(ast, fnname)
+    py = isl2py_fn(ast, "fn")
 
     # isl_map_to_ast works by generating code for rel.unwrap() The resulting
     # python function returns a tuple containing items from the domain and the
@@ -217,175 +227,314 @@ def isl_map_to_pyfn(rel, fnname, s=None):
     # Here, we apply a transformation that structures the yields of the
     # generated function so that they yield a 2-tuple of tuples, one for the
     # doimain and one for the image.
+    #
+    # NB: This is needed even for (n, 1) structures: (i, j) becomes ((i,), (j,))
+    structure_tuple_yields(s).visit(py)
+    return py
+
+
+@functools.lru_cache(maxsize=None)
+def isl_rel_loc_to_max_iter_cached(wr_key: str, rd_key: str) -> isl.Map:
+    """ isl_rel_loc_to_max_iter() for relations given in string form
+
+    Pipelines often connect stages with identical access relations, so this
+    avoids recomputing the same relation. The result is shared across callers.
+    """
+    return isl_rel_loc_to_max_iter(isl.Map(wr_key), isl.Map(rd_key))
+
+
+def isl_rel_loc_to_max_iter_shared(wr_a: isl.Map, rd_a: isl.Map) -> isl.Map:
+    """ isl_rel_loc_to_max_iter(), shared across relations that only differ in
+    their tuple (stage and object) names
+
+    For example, in a chain of identical layers, every stage reads its input
+    the same way its predecessor wrote it. The relations are computed with
+    canonical tuple names, and the names are restored in the result.
+    """
+    (in_, out) = (isl.dim_type.in_, isl.dim_type.out)
+    obj_name = rd_a.get_tuple_name(out)
+    rd_name = rd_a.get_tuple_name(in_)
+    wr_key = str(wr_a.set_tuple_name(in_, "WR").set_tuple_name(out, "OBJ"))
+    rd_key = str(rd_a.set_tuple_name(in_, "RD").set_tuple_name(out, "OBJ"))
+    rel = isl_rel_loc_to_max_iter_cached(wr_key, rd_key)
+    return rel.set_tuple_name(in_, obj_name).set_tuple_name(out, rd_name)
+
+
+def isl_map_to_pyfn(rel, fnname, s=None):
+    """ Transform an isl map to a python function """
     if s is None:
         s = (_nin, _nout) = tuple(
             rel.space.dim(x) for x in (isl.dim_type.in_, isl.dim_type.out)
         )
-    StructureTupleYields(s).visit(py)
+    # Generated functions only depend on the relation, so we cache them. The
+    # caller might modify the function (e.g., add decorators), so return a
+    # copy.
+    py = copy.deepcopy(isl_map_to_pyfn_cached(str(rel), s))
+    py.name = fnname
     return py
 
 
-def rel_a_iter(rel_iter):
+def rel_a_groups(rel_iter):
     # Accesses iterators (si.rd_a, and si.wr_a) iterate the relation from
     # indices to object locations. However, an iteration might require
     # multiple locations (usually for reads).
     #
-    # This is an adapter that groups all accesses for a single iteration
-    # into a list, and yields the iteration index with the access list
-    last_idx = None
-    l = []
-    for ri in rel_iter():
-        try:
-            (idx, loc) = ri
-        except ValueError:
-            print(
-                "%s: ri=%s cannot be packed into (idx,loc)"
-                % (rel_iter.__name__, ri,)
-            )
-            raise
-        if idx == last_idx:
-            l.append(loc)
-        else:
-            if len(l) != 0:
-                yield (last_idx, l)
-            l = [loc]
-            last_idx = idx
-    if len(l) > 0:
-        yield (last_idx, l)
+    # This groups all accesses for a single iteration into a list, and
+    # returns a list of (iteration index, access list) pairs. The relation is
+    # scanned once into an (N, nin + nout) integer table, and rows are grouped
+    # by splitting the table where the iteration index changes.
+    pairs = list(rel_iter())
+    if len(pairs) == 0:
+        return []
+    nin = len(pairs[0][0])
+    table = np.array([idx + loc for (idx, loc) in pairs], dtype=np.int64)
+    table = table.reshape(len(pairs), -1)
+    splits = np.flatnonzero(np.diff(table[:, :nin], axis=0).any(axis=1)) + 1
+    return [
+        (tuple(g[0, :nin].tolist()), [tuple(r) for r in g[:, nin:].tolist()])
+        for g in np.split(table, splits)
+    ]
 
 
 @dc.dataclass(init=False)
 class ExecOp:
+    """ Operation to be executed for a single iteration
+
+    Accesses are kept in a flat list of slots: one for every read object,
+    followed by one for every written object. Each slot holds the list of
+    locations accessed in the current iteration (or None).
+
+    Object ids (see Core.bind_ops()) are None for objects that do not exist in
+    the core (i.e., objects written to other stages). rd_fwd (also set by
+    Core.bind_ops()) marks the reads that can use the result of a previous MxV
+    operation in the same iteration, instead of reading the object.
+    """
+
     ty: str
-    accesses: typing.Dict[
-        str,
-        typing.Dict[str, typing.Optional[typing.List[typing.Tuple[int, ...]]]],
-    ]
+    rd_objs: typing.List[str]
+    wr_objs: typing.List[str]
+    rd_ids: typing.List[typing.Optional[int]]
+    wr_ids: typing.List[typing.Optional[int]]
+    rd_fwd: typing.List[bool]
+    slots: typing.List[typing.Optional[typing.List[typing.Tuple[int, ...]]]]
+
+    __slots__ = (
+        "ty",
+        "rd_objs",
+        "wr_objs",
+        "rd_ids",
+        "wr_ids",
+        "rd_fwd",
+        "slots",
+        "none_slots",
+    )
 
     def __init__(self, ty, rd_objs, wr_objs):
         self.ty = ty
-        self.accesses = {}
-        self.accesses["RD"] = dict((o, None) for o in rd_objs)
-        self.accesses["WR"] = dict((o, None) for o in wr_objs)
+        self.rd_objs = list(rd_objs)
+        self.wr_objs = list(wr_objs)
+        self.rd_ids = [None] * len(self.rd_objs)
+        self.wr_ids = [None] * len(self.wr_objs)
+        self.rd_fwd = [False] * len(self.rd_objs)
+        self.none_slots = [None] * (len(self.rd_objs) + len(self.wr_objs))
+        self.slots = list(self.none_slots)
+
+    def slot_idx(self, a_ty: str, obj: str) -> int:
+        if a_ty == "RD":
+            return self.rd_objs.index(obj)
+        elif a_ty == "WR":
+            return len(self.rd_objs) + self.wr_objs.index(obj)
+        else:
+            raise ValueError("Unknown access type: %s" % (a_ty,))
+
+    def reset_slots(self):
+        self.slots[:] = self.none_slots
+
+    def rd_accesses(self) -> typing.Iterator[typing.Tuple[str, int, list]]:
+        """ (object, object id, locations) for every read """
+        return zip(self.rd_objs, self.rd_ids, self.slots)
+
+    def wr_accesses(self) -> typing.Iterator[typing.Tuple[str, int, list]]:
+        """ (object, object id, locations) for every write """
+        wr_slots = itertools.islice(self.slots, len(self.rd_objs), None)
+        return zip(self.wr_objs, self.wr_ids, wr_slots)
 
 
 class AccessIterator:
-    idx: typing.Tuple[int, ...]
     ops: typing.List[ExecOp]
+    # registered accesses: (op_id, slot, obj, [(idx, access_l), ...])
+    accs: typing.List[typing.Tuple[int, str, str, typing.List[typing.Any]]]
+
+    __slots__ = ("ops", "accs", "stage_name")
 
     def __init__(self, stage):
-        self.idx_ = None
         self.ops = [
             ExecOp(ty=op.op_ty, rd_objs=op.rd_objs(), wr_objs=op.wr_objs())
             for op in stage.si.ops
         ]
         self.stage_name = stage.get_name()  # For debugging messages
-        self.fns = []
+        self.accs = []
 
-    def set_access(self, op_id, a_ty, a_obj, a_list):
-        op = self.ops[op_id]
-        assert op.accesses[a_ty][a_obj] is None
-        op.accesses[a_ty][a_obj] = a_list
+    def set_access(self, op_id, slot, a_list):
+        op_slots = self.ops[op_id].slots
+        assert op_slots[slot] is None
+        op_slots[slot] = a_list
 
     def reset_access(self):
         for op in self.ops:
-            for ty in ("RD", "WR"):
-                for obj in op.accesses[ty]:
-                    op.accesses[ty][obj] = None
-        self.idx_ = None
+            op.reset_slots()
 
     def register_iter_fn(self, op_id, op_ty, a_ty, obj):
-        def update_state_dec(fn):
-            for (idx, access_l) in fn:
-                # print("%s: LOOP: => idx_=%s idx=%s" %(self.stage_name, self.idx_, idx))
-                # Verify that all iterators operate on the same domain by
-                # checking that they produced the same index
-                if self.idx_ is None:
-                    self.idx_ = idx
-                else:
-                    assert (
-                        self.idx_ == idx
-                    ), "Expecting idx=%s but got idx=%s" % (self.idx_, idx,)
-                self.set_access(op_id, a_ty, obj, access_l)
-                yield
-
         def decorator(fn):
-            wrapped_fn = lambda: update_state_dec(rel_a_iter(fn))
-            self.fns.append(wrapped_fn)
+            # The access relation is the same for every input, so we scan it
+            # once and replay the result.
+            groups = rel_a_groups(fn)
+            slot = self.ops[op_id].slot_idx(a_ty, obj)
+            self.accs.append((op_id, slot, obj, groups))
             return fn
 
         return decorator
 
+    def join(self):
+        """ Join the registered accesses on the iteration index
+
+        Returns a list with an (idx, [(op_id, slot, access_l), ...]) item for
+        every iteration.
+        """
+        ret = None
+        for (op_id, slot, obj, groups) in self.accs:
+            if ret is None:
+                ret = [(idx, []) for (idx, _) in groups]
+            # Verify that all iterators operate on the same domain by
+            # checking that they produced the same indices
+            assert len(groups) == len(
+                ret
+            ), "%s: %s has %d iterations, expecting %d" % (
+                self.stage_name,
+                obj,
+                len(groups),
+                len(ret),
+            )
+            for ((idx, access_l), (j_idx, j_accs)) in zip(groups, ret):
+                assert (
+                    idx == j_idx
+                ), "Expecting idx=%s but got idx=%s" % (j_idx, idx,)
+                j_accs.append((op_id, slot, access_l))
+        return ret if ret is not None else []
+
     def loop(
         self, inp_limit: typing.Optional[int] = None
     ) -> typing.Iterator[typing.List[ExecOp]]:
+        iters = self.join()
+        assert len(iters) > 0
         for inp in itertools.count():
             if inp_limit is not None and inp >= inp_limit:
                 break
-            iters = [f() for f in self.fns]
-            niters = 0
-            for _ in zip(*iters):
-                # print("%s: LOOP => %s " % (self.stage_name, self.idx_))
-                niters += 1
-                yield ((inp,) + self.idx_, self.ops)
+            for (idx, accs) in iters:
+                for (op_id, slot, access_l) in accs:
+                    self.set_access(op_id, slot, access_l)
+                yield ((inp,) + idx, self.ops)
                 self.reset_access()
-            assert niters > 0
+
+
+# max_iter for objects that we never wait for: compares larger than any
+# iteration tuple
+_INF_ITER = (math.inf,)
 
 
 class LocToMaxIterIterator:
+    __slots__ = (
+        "objs",
+        "obj_idx",
+        "max_iters",
+        "npending",
+        "min_max_iter",
+        "max_iter_gs",
+        "stage_name",
+    )
+
     def __init__(self, stage):
-        # Maximum iteration allowed for every object that needs to be read
+        # Objects that need to be read (in a fixed order), and their index
+        self.objs = tuple(sorted(stage.si.ro_objs))
+        self.obj_idx = dict((o, i) for (i, o) in enumerate(self.objs))
+        # Maximum iteration allowed for every object (same order as objs).
         #  if maximum iteration is None, no writes have happened yet.
-        self.obj_max_iter = dict((o, None) for o in stage.si.ro_objs)
+        #  if it is _INF_ITER, we do not wait for writes on the object.
+        self.max_iters = [None] * len(self.objs)
+        # Number of objects for which no writes have happened yet
+        self.npending = len(self.objs)
+        # Minimum of max_iters values (None if there are pending objects).
+        # Because max_iter values only advance, we only need to recompute it
+        # when the object holding the minimum is updated.
+        self.min_max_iter = None if self.objs else _INF_ITER
 
         # Initialized generators
         self.max_iter_gs = {}
 
         self.stage_name = stage.get_name()  # debugging
 
-    def register_iter_fn(self, obj):
-        def max_iter_gen(fn):
-            """ Python generator that consumers writes and updates self.obj_max_iter """
+    def register_table(self, obj, table: np.ndarray, nin: int):
+        """ Register the loc_to_max_iter relation of an object
 
-            print(
-                "%s: Initializing max_iter_gen generator for object: %s (%s)"
-                % (self.stage_name, obj, fn)
+        table: (N, nin + nout) array with a (write location, max iteration)
+        pair in every row, sorted in the order writes happen.
+        """
+        obj_i = self.obj_idx[obj]
+
+        def max_iter_gen(pairs):
+            """ Python generator that consumers writes and updates self.max_iters """
+
+            _LOG.debug(
+                "%s: Initializing max_iter_gen generator for object: %s",
+                self.stage_name,
+                obj,
             )
             # inp  is the id of the input (typically image) being processed
             # This is used to maintain proper ordering when we wrap-around
             for inp in itertools.count():
-                for (write, max_iter) in fn():
+                for (write, max_iter) in pairs:
                     while True:
                         new_write = yield
                         if new_write == write:
-                            self.obj_max_iter[obj] = (inp,) + max_iter
-                            print(
-                                "%s:\tGot expected write: %s. max_iter is now: %s"
-                                % (
-                                    self.stage_name,
-                                    new_write,
-                                    self.obj_max_iter[obj],
-                                )
+                            self.set_max_iter(obj_i, (inp,) + max_iter)
+                            _LOG.debug(
+                                "%s:\tGot expected write: %s. max_iter is now: %s",
+                                self.stage_name,
+                                new_write,
+                                self.max_iters[obj_i],
                             )
                             break
                         else:
-                            print(
-                                "%s:\tGot %s, but expecting %s to change max_iter"
-                                % (self.stage_name, new_write, write)
+                            _LOG.debug(
+                                "%s:\tGot %s, but expecting %s to change max_iter",
+                                self.stage_name,
+                                new_write,
+                                write,
                             )
 
-        def decorator(fn):
-            # Initialize generator
-            gen = max_iter_gen(fn)
-            gen.send(None)
-            assert obj not in self.max_iter_gs
-            self.max_iter_gs[obj] = gen
-            return fn
-
-        return decorator
+        pairs = [(tuple(r[:nin]), tuple(r[nin:])) for r in table.tolist()]
+        # Initialize generator
+        gen = max_iter_gen(pairs)
+        gen.send(None)
+        assert obj not in self.max_iter_gs
+        self.max_iter_gs[obj] = gen
+
+    def set_max_iter(self, obj_i: int, max_iter):
+        """ Set the max iteration of the obj_i-th object """
+        max_iters = self.max_iters
+        prev = max_iters[obj_i]
+        max_iters[obj_i] = max_iter
+        if prev is None:
+            self.npending -= 1
+        if self.npending:
+            return
+        if prev is None or prev == self.min_max_iter:
+            self.min_max_iter = min(max_iters)
+        elif max_iter < self.min_max_iter:
+            self.min_max_iter = max_iter
 
     def set_dont_wait_for_reads(self, objname):
-        del self.obj_max_iter[objname]
+        self.set_max_iter(self.obj_idx[objname], _INF_ITER)
 
     def handle_write(self, obj, wr_idx):
         # Call the generator that consumes writes
@@ -393,22 +542,27 @@ class LocToMaxIterIterator:
 
     def reads_ready(self, idx):
         """ Return whether the reads for iteration i are ready """
+        # NB: if there are no objects to wait for, min_max_iter is _INF_ITER
+        # and reads are always ready
+        return self.npending == 0 and idx <= self.min_max_iter
 
-        def obj_rdy(idx, obj: str, max_iter) -> bool:
-            if max_iter is None:
-                print(
-                    "%s: max_iter for object %s unset. Reads not ready"
-                    % (self.stage_name, obj)
-                )
-                return False
-            assert isinstance(max_iter, tuple)
-            assert len(idx) == len(max_iter)
-            return idx <= max_iter
-
-        # NB: if the iteratable is empty, all() returns true
-        return all(
-            obj_rdy(idx, o, max_i) for (o, max_i) in self.obj_max_iter.items()
-        )
+
+@dc.dataclass
+class StageObjectDesc:
+    """ Object read by a stage, passed to Stage.configure_objects() """
+
+    name: str
+    info: ObjectInfo
+    internal: bool  # object is written and read by the stage
+    # relation from observed writes to the maximum iteration that can be
+    # executed, or None if we do not wait for writes (or the object is internal)
+    loc_to_max_iter: typing.Optional[isl.Map]
+
+    __slots__ = ("name", "info", "internal", "loc_to_max_iter")
+
+
+# Compiled code for generated stage modules. See Stage.build_module_()
+_MODULE_CODE_CACHE: typing.Dict[tuple, types.CodeType] = {}
 
 
 class Stage:
@@ -425,6 +579,11 @@ class Stage:
         self.param_vals = param_vals if param_vals is not None else dict()
         self.print_ast_ = False
 
+        # Object names, in a fixed (sorted) order
+        self.ro_objnames = tuple(sorted(self.si.ro_objs))
+        self.wo_objnames = tuple(sorted(self.si.wo_objs))
+        self.rw_objnames = tuple(sorted(self.si.rw_objs))
+
         # For every object this stage needs to read, this dict stores the ISL
         # relation that provides the following mapping:
         #  observed object writes to the maximum iteration that can be executed.
@@ -436,20 +595,20 @@ class Stage:
         self.access_i = AccessIterator(self)
         self.loctomaxiter_i = LocToMaxIterIterator(self)
 
-    def get_ro_objnames(self) -> typing.Set[str]:
+    def get_ro_objnames(self) -> typing.Tuple[str, ...]:
         """ Return the objects that this stage reads (only) """
-        return self.si.ro_objs
+        return self.ro_objnames
 
-    def get_wo_objnames(self) -> typing.Set[str]:
+    def get_wo_objnames(self) -> typing.Tuple[str, ...]:
         """ Return the objects that this stage writes (only) """
-        return self.si.wo_objs
+        return self.wo_objnames
 
-    def get_rw_objnames(self) -> typing.Set[str]:
+    def get_rw_objnames(self) -> typing.Tuple[str, ...]:
         """ Return the objects that this stage both writes and reads.
 
         These are objects internal in the stage.
         """
-        return self.si.rw_objs
+        return self.rw_objnames
 
     def attach_to_pipeline(self, pipeline_write, execute_ops):
         self.pipeline_write = pipeline_write
@@ -465,18 +624,36 @@ class Stage:
         self.loctomaxiter_rel[objname] = rel
 
     def set_dont_wait_for_reads(self, objname):
-        """ Remove objname from obj_max_iter so that we never wait for reads on this object """
+        """ Never wait for reads on objname """
         if self.loctomaxiter_rel[objname] is not None:
             raise ValueError(
                 "loctomaxiter_rel alredy set for object %s" % (objname,)
             )
         self.loctomaxiter_i.set_dont_wait_for_reads(objname)
 
+    def configure_objects(self, descs: typing.List[StageObjectDesc]):
+        """ Allocate the objects this stage reads and set up waiting on them """
+        core = self.core
+        for desc in descs:
+            if desc.internal:
+                core.alloc_internal_object(desc.name, desc.info)
+                continue
+            core.alloc_object(desc.name, desc.info)
+            if desc.loc_to_max_iter is None:
+                self.set_dont_wait_for_reads(desc.name)
+            else:
+                rel = desc.loc_to_max_iter
+                self.set_isl_rel_loc_to_max_iter(desc.name, rel)
+
     def build_module(self):
         self.pymod = self.build_module_()
+        # objects have been allocated at this point
+        self.core.bind_ops(self.access_i.ops, self.si.ops)
 
     def build_module_(self):
-        body = []
+        # Every generated function is described by a (name, relation,
+        # decorator) tuple.
+        fns = []
 
         for (op_id, op) in enumerate(self.si.ops):
             # Generate individual functions for every access
@@ -496,44 +673,51 @@ class Stage:
                     acc.a_ty.lower(),
                     acc.get_obj_name(),
                 )
-                py = isl_map_to_pyfn(acc.access, fn_name)
-                s = "access_iter(op_id=%d, op_ty='%s', a_ty='%s', obj='%s')" % (
+                dec = "access_iter(op_id=%d, op_ty='%s', a_ty='%s', obj='%s')" % (
                     op_id,
                     op.op_ty,
                     acc.a_ty,
                     acc.get_obj_name(),
                 )
-                dec_call = pyast.parse(s).body[0].value
-                py.decorator_list.append(dec_call)
-                body.append(py)
+                fns.append((fn_name, acc.access, dec))
 
-        # generate loc_to_max_iter() functions for every object read by this stage
+        # loc_to_max_iter relations are not compiled: we enumerate them once
+        # and register the resulting tables directly.
         for (obj, rel) in self.loctomaxiter_rel.items():
             if rel is not None:
-                fnname = "%s_%s_loc_to_max_iter" % (self.get_name(), obj)
-                py = isl_map_to_pyfn(rel, fnname)
-                s = "loc_to_maxiter_iter(obj='%s')" % (obj,)
-                dec_call = pyast.parse(s).body[0].value
+                nin = rel.space.dim(isl.dim_type.in_)
+                table = isl_map_to_table(rel, self.param_vals)
+                self.loctomaxiter_i.register_table(obj, table, nin)
+
+        # The generated code does not depend on the parameter values (they are
+        # passed as module globals), so we can reuse the compiled code of any
+        # module with the same functions.
+        code_key = tuple((fn_name, str(rel), dec) for (fn_name, rel, dec) in fns)
+        code = _MODULE_CODE_CACHE.get(code_key)
+        if code is None or self.print_ast_:
+            body = []
+            for (fn_name, rel, dec) in fns:
+                py = isl_map_to_pyfn(rel, fn_name)
+                dec_call = pyast.parse(dec).body[0].value
                 py.decorator_list.append(dec_call)
                 body.append(py)
 
-        ast_mod = pyast.Module(body=body)
-        if self.print_ast_:
-            s = "Module for %s" % (self.get_name(),)
-            print("-" * 10, s, "-" * (80 - 10 - len(s) - 2))
-            # print(astpp_dump(ast_mod))
-            # print("-"*80)
-            print(pyastor.to_source(ast_mod))
-            print("-" * 80)
-
-        pyast.fix_missing_locations(ast_mod)
-        code = compile(ast_mod, "<generated>", "exec")
+            ast_mod = pyast.Module(body=body, type_ignores=[])
+            pyast.fix_missing_locations(ast_mod)
+            if self.print_ast_:
+                s = "Module for %s" % (self.get_name(),)
+                print("-" * 10, s, "-" * (80 - 10 - len(s) - 2))
+                # print(astpp_dump(ast_mod))
+                # print("-"*80)
+                print(ast_to_source(ast_mod))
+                print("-" * 80)
+
+            code = compile(ast_mod, "<generated>", "exec")
+            _MODULE_CODE_CACHE[code_key] = code
+
         ret = types.ModuleType("stage_%s" % (self.get_name()))
         ret.__dict__.update(self.param_vals)
         ret.__dict__.update({"access_iter": self.access_i.register_iter_fn})
-        ret.__dict__.update(
-            {"loc_to_maxiter_iter": self.loctomaxiter_i.register_iter_fn}
-        )
         exec(code, ret.__dict__)
         return ret
 
@@ -552,14 +736,25 @@ class Stage:
         if self.pipeline_write is not None:
             self.pipeline_write(self, wr_obj, wr_idx, wr_val)
 
+    def issue_writes(self, writes):
+        """ Issue (and clear) a list of (wr_obj, wr_idx, wr_val) writes """
+        for (wr_obj, wr_idx, wr_val) in writes:
+            self.issue_write(wr_obj, wr_idx, wr_val)
+        writes.clear()
+
     def write_callback(self, wr_objstr, wr_idx, wr_val):
         """ Write callback executed on the reader
 
         Writes the data to the core-local object and executes the "snooping for
         SRAM writes" logic.
         """
-        print("%s: Callback on write: wr_obj:%s wr_idx:%s wr_val:%s"
-             % (self.get_name(), wr_objstr, wr_idx, wr_val))
+        _LOG.debug(
+            "%s: Callback on write: wr_obj:%s wr_idx:%s wr_val:%s",
+            self.get_name(),
+            wr_objstr,
+            wr_idx,
+            wr_val,
+        )
 
         # the write should be in the object that we read
         assert wr_objstr in self.si.ro_objs
@@ -572,28 +767,62 @@ class Stage:
 
         self.loctomaxiter_i.handle_write(wr_objstr, wr_idx)
 
-    def tick_gen(self, loop_inp_limit=None):
+    def tick_gen(self, loop_inp_limit=None, batch=1):
         """ Tick generator: executes a single tick
 
         yields the iteration executed or None if it was stalled
+
+        batch: number of iterations whose writes are buffered before they are
+        issued to the pipeline. Buffered writes are also issued before
+        stalling and when the loop is done, so that readers of this stage's
+        outputs never wait on writes that are held back.
+
+        NB: This is not a generator itself, so that arguments are validated
+        when the generator is created (see tick_gen_()).
         """
+        if batch < 1:
+            raise ValueError("batch (%s) should be at least 1" % (batch,))
+        return self.tick_gen_(loop_inp_limit, batch)
+
+    def tick_gen_(self, loop_inp_limit, batch):
+        """ Tick generator (see tick_gen()) """
+        pending = []  # (objstr, wr_i, wr_v) writes not issued yet
+        pending_iters = 0
         for (idx, ops) in self.access_i.loop(loop_inp_limit):
-            while not self.reads_ready(idx):
-                print("%s: Stalling iteration %s." % (self.get_name(), idx))
-                yield None
+            if not self.reads_ready(idx):
+                self.issue_writes(pending)
+                pending_iters = 0
+                while not self.reads_ready(idx):
+                    if _LOG.isEnabledFor(logging.DEBUG):
+                        _LOG.debug(
+                            "%s: Stalling iteration %s.", self.get_name(), idx,
+                        )
+                    yield None
 
-            print("%s: Executing iteration %s." % (self.get_name(), idx))
+            if _LOG.isEnabledFor(logging.DEBUG):
+                _LOG.debug("%s: Executing iteration %s.", self.get_name(), idx)
             if self.execute_ops:
                 out = self.core.execute_ops(ops)
             else:
                 out = self.core.validate_ops(ops)
 
-            for (objstr, objvals) in out.items():
-                for (wr_i, wr_v) in objvals:
-                    self.issue_write(objstr, wr_i, wr_v)
+            for (objstr, (wr_is, wr_vs)) in out.items():
+                if wr_vs is None:
+                    for wr_i in wr_is:
+                        pending.append((objstr, wr_i, None))
+                else:
+                    wr_vs = wr_vs.tolist()
+                    for i in range(len(wr_is)):
+                        pending.append((objstr, wr_is[i], wr_vs[i]))
+            pending_iters += 1
+            if pending_iters >= batch:
+                self.issue_writes(pending)
+                pending_iters = 0
 
             yield idx
 
+        self.issue_writes(pending)
+
     def __repr__(self):
         return "Stage(%s)" % (self.si,)
 
@@ -601,9 +830,14 @@ class Stage:
 class CoreConf:
     """ Core configuration """
 
-    def __init__(self, xbar_m: np.ndarray):
-        """ Intialize core configuration """
+    def __init__(self, xbar_m: np.ndarray, xbar_dtype: type = np.float64):
+        """ Intialize core configuration
+
+        xbar_dtype: dtype of the crossbar matrix. Using, e.g., np.float32
+          halves the memory traffic of MxV at the cost of precision.
+        """
         self.xbar_m = xbar_m
+        self.xbar_dtype = xbar_dtype
 
 
 class Core:
@@ -616,16 +850,33 @@ class Core:
     objs: typing.Dict[str, np.ndarray]
     objs_info: typing.Dict[str, ObjectInfo]
 
+    __slots__ = (
+        "xbar_m",
+        "objs",
+        "objs_info",
+        "internal_objs",
+        "obj_ids",
+        "objs_l",
+        "objs_info_l",
+        "objs_internal_l",
+    )
+
     def __init__(self):
         self.xbar_m = None
         self.objs = {}
         self.objs_info = {}
         self.internal_objs = {}
+        # Objects (both core-local and internal) are also indexed by an integer
+        # id, so that executing operations does not need name lookups.
+        self.obj_ids = {}  # name -> id
+        self.objs_l = []  # id -> object
+        self.objs_info_l = []  # id -> object info
+        self.objs_internal_l = []  # id -> whether object is internal
 
     def configure(self, cnf: CoreConf):
-        self.set_xbar_matrix(cnf.xbar_m)
+        self.set_xbar_matrix(cnf.xbar_m, cnf.xbar_dtype)
 
-    def set_xbar_matrix(self, xbar_m):
+    def set_xbar_matrix(self, xbar_m, xbar_dtype=np.float64):
         (xbar_m_width, xbar_m_height) = xbar_m.shape
         # we accept whatever matrix we are given, as long as it fits into the
         # crossbar.
@@ -634,12 +885,13 @@ class Core:
                 "XBAR too small: XBAR width is %d, while given matrix shape is:%s"
                 % (self.width, xbar_m.shape)
             )
-        self.xbar_m = xbar_m.copy()
+        # Keep a C-contiguous copy so that MxV is a straight gemv call
+        self.xbar_m = np.array(xbar_m, dtype=xbar_dtype, order="C")
 
     def alloc_object(self, objname: str, info: ObjectInfo):
         padded_shape = info.get_padded_shape()
         print("Allocating %s (padded_shape:%s)" % (objname, padded_shape))
-        obj = np.zeros(padded_shape)
+        obj = np.zeros(padded_shape, dtype=info.dtype)
         self.set_object(objname, obj, info)
 
     def set_object(self, objname: str, obj: np.ndarray, info: ObjectInfo):
@@ -649,13 +901,14 @@ class Core:
         if objname in self.objs_info:
             raise ValueError("info for object %s already exists" % (objname,))
         self.objs_info[objname] = info
+        self.add_obj_id(objname, obj, info, False)
 
     def get_object(self, objname: str):
         return self.objs[objname]
 
     def alloc_internal_object(self, objname: str, info: ObjectInfo):
         padded_shape = info.get_padded_shape()
-        obj = np.zeros(padded_shape)
+        obj = np.zeros(padded_shape, dtype=info.dtype)
         self.set_internal_object(objname, obj, info)
 
     def set_internal_object(
@@ -667,6 +920,51 @@ class Core:
         if objname in self.objs_info:
             raise ValueError("info for object %s already exists" % (objname,))
         self.objs_info[objname] = info
+        self.add_obj_id(objname, obj, info, True)
+
+    def add_obj_id(
+        self, objname: str, obj: np.ndarray, info: ObjectInfo, internal: bool
+    ):
+        self.obj_ids[objname] = len(self.objs_l)
+        self.objs_l.append(obj)
+        self.objs_info_l.append(info)
+        self.objs_internal_l.append(internal)
+
+    def bind_ops(
+        self, ops: typing.List[ExecOp], op_infos: typing.List[OpInfo]
+    ):
+        """ Set the object ids of the given operations' accesses
+
+        Also decide which ADD reads can use the result of a previous MxV
+        directly (e.g., y = W*x + b): the MxV must write the (unpadded) object
+        with the same relation that the ADD reads it.
+        """
+        # object id -> relation of the last MxV that writes the object
+        mxv_wr_rels = {}
+        for (op, op_info) in zip(ops, op_infos):
+            for (i, rd_objstr) in enumerate(op.rd_objs):
+                if rd_objstr not in self.obj_ids:
+                    raise ValueError(
+                        "object %s does not exist in this core" % (rd_objstr,)
+                    )
+                op.rd_ids[i] = self.obj_ids[rd_objstr]
+            for (i, wr_objstr) in enumerate(op.wr_objs):
+                op.wr_ids[i] = self.obj_ids.get(wr_objstr, None)
+
+            if op.ty == "ADD":
+                rd_as = op_info.rd_accesses()
+                for (i, (rd_id, rd_a)) in enumerate(zip(op.rd_ids, rd_as)):
+                    wr_rel = mxv_wr_rels.get(rd_id, None)
+                    op.rd_fwd[i] = (
+                        wr_rel is not None
+                        and not self.objs_info_l[rd_id].is_padded()
+                        and wr_rel.is_equal(rd_a.access)
+                    )
+            elif op.ty == "MxV":
+                wr_as = op_info.wr_accesses()
+                for (wr_id, wr_a) in zip(op.wr_ids, wr_as):
+                    if wr_id is not None:
+                        mxv_wr_rels[wr_id] = wr_a.access
 
     def get_internal_object(self, objname: str):
         return self.internal_objs[objname]
@@ -676,32 +974,29 @@ class Core:
 
         Ensure that the reads are within the array bounds.
         Will raise an error if that's not the case
+
+        Returns the same as execute_ops(), but without write values (None).
         """
 
         # TODO: Use self.read_object()
         ret = {}
         for op in ops:
-            for (rd_objstr, rd_is) in op.accesses["RD"].items():
-                if rd_objstr not in self.objs:
-                    raise ValueError(
-                        "object %s does not exist in this core" % (rd_objstr,)
+            for (rd_objstr, rd_id, rd_is) in op.rd_accesses():
+                obj = self.objs_l[rd_id]
+                idx_arr = np.asarray(rd_is)
+                assert idx_arr.ndim == 2 and idx_arr.shape[1] == len(
+                    obj.shape
+                ), "rd_is=%s obj.shape=%s" % (rd_is, obj.shape)
+                if not (
+                    (idx_arr >= 0).all() and (idx_arr < obj.shape).all()
+                ):
+                    raise IndexError(
+                        "Failed to access %s (shape=%s) on %s"
+                        % (rd_objstr, obj.shape, rd_is)
                     )
-                obj = self.objs[rd_objstr]
-                for idx in rd_is:
-                    assert isinstance(idx, tuple) and len(idx) == len(
-                        obj.shape
-                    ), "idx=%s obj.shape=%s" % (idx, obj.shape)
-                    try:
-                        _ = obj[idx]
-                    except:
-                        print(
-                            "Failed to access %s (shape=%s) on %s"
-                            % (rd_objstr, obj.shape, idx)
-                        )
-                        raise
-                for (wr_objstr, wr_is) in op.accesses["WR"].items():
-                    assert wr_objstr not in ret
-                    ret[wr_objstr] = zip(wr_is, itertools.repeat(None))
+            for (wr_objstr, _, wr_is) in op.wr_accesses():
+                assert wr_objstr not in ret
+                ret[wr_objstr] = (wr_is, None)
 
         return ret
 
@@ -713,101 +1008,115 @@ class Core:
         unpad_oi: object info if we want to "unpad" the object, or None
         """
         # An object is either a core-local object or an intermediate result from this set of operations.
-        if objstr in self.objs:
-            obj = self.objs[objstr]
-        elif objstr in self.internal_objs:
-            obj = self.internal_objs[objstr]
-        else:
+        if objstr not in self.obj_ids:
             raise ValueError(
                 "object %s not found in local objects (%s) or intermediate results (%s)"
                 % (objstr, ",".join(self.objs), ",".join(self.internal_objs))
             )
+        return self.read_object_id(self.obj_ids[objstr], rd_is, unpad_oi)
 
+    def read_object_id(self, obj_id: int, rd_is, unpad_oi=None):
+        """ Read data from object local to this core, given its id
+
+        See read_object()
+        """
+        obj = self.objs_l[obj_id]
         if unpad_oi is not None:
             obj = unpad_oi.get_unpadded_slice(obj)
 
-        # NB: not sure if we need to deal with multi-dimensional objects or how
-        # to. For now assume that objects stored on cores are 1D
-        ret = np.zeros(shape=(len(rd_is),))
-        for i, idx in enumerate(rd_is):
-            # We check if there is a shape attribute to accomodate the stupid way we deal with intermediate results.
-            # Once we fix this, we can remove the check.
-            assert isinstance(idx, tuple) and (
-                getattr(obj, "shape", None) is None
-                or len(idx) == len(obj.shape)
-            ), "idx=%s obj.shape=%s" % (idx, obj.shape)
-            ret[i] = obj[idx]
-        return ret
+        # Gather all indices at once: (K, ndim) index array -> K values
+        idx_arr = np.asarray(rd_is, dtype=np.intp)
+        assert idx_arr.shape == (len(rd_is), obj.ndim), "rd_is=%s obj.shape=%s" % (
+            rd_is,
+            obj.shape,
+        )
+        if obj.ndim == 1:
+            return obj.take(idx_arr[:, 0])
+        return obj[tuple(idx_arr.T)]
 
     def handle_op_output(
         self,
         objstr: str,
-        results: typing.Dict[str, np.ndarray],
+        obj_id: typing.Optional[int],
+        results: typing.Dict[str, typing.Tuple[list, np.ndarray]],
         wr_is: typing.List[typing.Tuple[int, ...]],
         wr_vs: np.ndarray,
     ):
         """ Handle operation output
 
         objstr: object
+        obj_id: object id (None if the object does not exist in this core)
         results: what we will return when we are done with executing operations
         wr_is: write indices
         wr_vs: write values
         """
 
-        if objstr in self.internal_objs:
+        if obj_id is not None and self.objs_internal_l[obj_id]:
             # If this is an internal object, just write the values to it
-            obj = self.get_internal_object(objstr)
-            for (w_i, w_v) in zip(wr_is, wr_vs):
-                obj[w_i] = w_v
+            obj = self.objs_l[obj_id]
+            idx_arr = np.asarray(wr_is, dtype=np.intp)
+            obj[tuple(idx_arr.T)] = wr_vs
         else:
             # Otherwise update results
             assert objstr not in results
-            results[objstr] = zip(wr_is, wr_vs)
+            results[objstr] = (wr_is, wr_vs)
+
+    def execute_ops(
+        self, ops: ExecOp
+    ) -> typing.Dict[str, typing.Tuple[list, np.ndarray]]:
+        """ Execute operations
 
-    def execute_ops(self, ops: ExecOp) -> typing.Dict[str, np.ndarray]:
-        """ Execute operations """
+        Returns a dict of object -> (write indices, write values) for the
+        objects written outside the core.
+        """
         if self.xbar_m is None:
             raise RuntimeError("core xbar matrix is undefined")
 
-        execute_ops_debug_ = True
+        execute_ops_debug_ = _LOG.isEnabledFor(logging.DEBUG)
         if ops[0].ty != "MxV":
-            print("First operation is not on the crossbar (MxV)")
+            _LOG.debug("First operation is not on the crossbar (MxV)")
 
         # Each operation has a predefined number of inputs, but can have an
         # arbitrary number of outputs, where results are copied. Some outputs,
         # might be used as intermediate results by subsequent operations.
         # These are not returned.
         results = {}
+        # MxV results written to internal objects: obj_id -> y
+        mxv_outs = {}
         for op in ops:
             if op.ty == "MxV":
-                if len(op.accesses["RD"]) != 1:
+                if len(op.rd_objs) != 1:
                     raise ValueError(
                         "MxV: expecting 1 read argument (got %d)."
-                        % (len(op.accesses["RD"],))
+                        % (len(op.rd_objs),)
                     )
-                (rd_objstr, rd_is) = next(iter(op.accesses["RD"].items()))
+                (rd_objstr, rd_id, rd_is) = next(op.rd_accesses())
                 if execute_ops_debug_:
-                    print("    MxV: RD obj=%s is=%s" % (rd_objstr, rd_is))
+                    _LOG.debug("    MxV: RD obj=%s is=%s", rd_objstr, rd_is)
                 # Fill input vector for mxv
-                x = self.read_object(rd_objstr, rd_is)
-                y = np.matmul(self.xbar_m, x)
-                for (wr_objstr, wr_is) in op.accesses["WR"].items():
+                x = self.read_object_id(rd_id, rd_is)
+                y = self.xbar_m.dot(x.astype(self.xbar_m.dtype, copy=False))
+                for (wr_objstr, wr_id, wr_is) in op.wr_accesses():
                     if execute_ops_debug_:
-                        print("    MxV: WR obj=%s is=%s" % (wr_objstr, wr_is))
-                    self.handle_op_output(wr_objstr, results, wr_is, y)
+                        _LOG.debug("    MxV: WR obj=%s is=%s", wr_objstr, wr_is)
+                    self.handle_op_output(wr_objstr, wr_id, results, wr_is, y)
+                    if wr_id is not None:
+                        # Forward the value as stored in the object
+                        obj_dtype = self.objs_l[wr_id].dtype
+                        mxv_outs[wr_id] = y.astype(obj_dtype, copy=False)
             elif op.ty == "ADD":
-                if len(op.accesses["RD"]) != 2:
+                if len(op.rd_objs) != 2:
                     raise ValueError(
                         "ADD: expecting 2 read arguments (got %d)."
-                        % (len(op.accesses["RD"],))
+                        % (len(op.rd_objs),)
                     )
-                rd_accesses = list(op.accesses["RD"].items())
+                rd_accesses = list(op.rd_accesses())
 
-                (rd_objstr1, rd_is1) = rd_accesses[0]
-                obj1_oi = self.objs_info[rd_objstr1]
+                (rd_objstr1, rd_id1, rd_is1) = rd_accesses[0]
+                obj1_oi = self.objs_info_l[rd_id1]
 
-                (rd_objstr2, rd_is2) = rd_accesses[1]
-                obj2_oi = self.objs_info[rd_objstr2]
+                (rd_objstr2, rd_id2, rd_is2) = rd_accesses[1]
+                obj2_oi = self.objs_info_l[rd_id2]
 
                 # TODO: There are some operations that are required to read the
                 # padded object (e.g., CONV) and some (e.g., ADD) that do not.
@@ -815,44 +1124,58 @@ class Core:
                 # appropriate object_info if we want to unpad. However, a
                 # better solution would be to just change access relations
                 # accordingly. Once we do that, we can remove this here.
-                x1 = self.read_object(rd_objstr1, rd_is1, unpad_oi=obj1_oi)
-                x2 = self.read_object(rd_objstr2, rd_is2, unpad_oi=obj2_oi)
+                #
+                # If an argument is the result of a previous MxV (e.g., y = W*x
+                # + b), we use that directly instead of reading it back from
+                # the internal object (see bind_ops()).
+                (fwd1, fwd2) = op.rd_fwd
+                if fwd1:
+                    x1 = mxv_outs[rd_id1]
+                else:
+                    x1 = self.read_object_id(rd_id1, rd_is1, unpad_oi=obj1_oi)
+                if fwd2:
+                    x2 = mxv_outs[rd_id2]
+                else:
+                    x2 = self.read_object_id(rd_id2, rd_is2, unpad_oi=obj2_oi)
 
                 if execute_ops_debug_:
-                    print("    ADD: RD1 obj=%s is=%s vs=%s" % (rd_objstr1, rd_is1, x1))
-                    print("    ADD: RD2 obj=%s is=%s vs=%s" % (rd_objstr2, rd_is2, x2))
+                    _LOG.debug(
+                        "    ADD: RD1 obj=%s is=%s vs=%s", rd_objstr1, rd_is1, x1,
+                    )
+                    _LOG.debug(
+                        "    ADD: RD2 obj=%s is=%s vs=%s", rd_objstr2, rd_is2, x2,
+                    )
                 y = np.add(x1, x2)
-                for (wr_objstr, wr_is) in op.accesses["WR"].items():
+                for (wr_objstr, wr_id, wr_is) in op.wr_accesses():
                     if execute_ops_debug_:
-                        print("    ADD: WR obj=%s is=%s" % (wr_objstr, wr_is))
-                    self.handle_op_output(wr_objstr, results, wr_is, y)
+                        _LOG.debug("    ADD: WR obj=%s is=%s", wr_objstr, wr_is)
+                    self.handle_op_output(wr_objstr, wr_id, results, wr_is, y)
             elif op.ty == "ID":
-                if len(op.accesses["RD"]) != 1:
+                if len(op.rd_objs) != 1:
                     raise ValueError(
                         "ID: expecting 2 read arguments (got %d)."
-                        % (len(op.accesses["RD"],))
+                        % (len(op.rd_objs),)
                     )
 
-                ((rd_objstr, rd_is),) = op.accesses["RD"].items()
-                x = self.read_object(rd_objstr, rd_is)
+                ((rd_objstr, rd_id, rd_is),) = op.rd_accesses()
+                x = self.read_object_id(rd_id, rd_is)
                 if execute_ops_debug_:
-                    print("    ID: RD1 obj=%s is=%s vs=%s" % (rd_objstr, rd_is, x))
+                    _LOG.debug(
+                        "    ID: RD1 obj=%s is=%s vs=%s", rd_objstr, rd_is, x,
+                    )
                 y = x.copy()
-                for (wr_objstr, wr_is) in op.accesses["WR"].items():
+                for (wr_objstr, wr_id, wr_is) in op.wr_accesses():
                     if execute_ops_debug_:
-                        print("    ADD: WR obj=%s is=%s" % (wr_objstr, wr_is))
-                    self.handle_op_output(wr_objstr, results, wr_is, y)
+                        _LOG.debug("    ADD: WR obj=%s is=%s", wr_objstr, wr_is)
+                    self.handle_op_output(wr_objstr, wr_id, results, wr_is, y)
             else:
                 raise ValueError("Unknown operation: %s" % (op.ty,))
 
         return results
 
     def write_obj(self, objname: str, w_idx, w_val):
-        try:
-            self.objs[objname][w_idx] = w_val
-        except:
-            print("Error accessing object %s on idx=%s" % (objname, w_idx))
-            raise
+        # NB: The index rank is checked by the pipeline (Pipeline.handle_write)
+        self.objs[objname][w_idx] = w_val
 
     def validate_write(self, objname: str, w_idx):
         _ = self.objs[objname][w_idx]
@@ -866,6 +1189,8 @@ class Object:
     reader: typing.Optional[str]  # name of reader stage
     writer: typing.Optional[str]  # name of writer stage
 
+    __slots__ = ("name", "info", "reader", "writer")
+
     def __repr__(self):
         return "Object(%s, info=%s)" % (self.name, self.info)
 
@@ -960,7 +1285,9 @@ class DummyGCU:
 
     def init_output_object(self, obj: Object, last_loc: typing.Tuple[int, ...]):
         assert obj.name not in self.output_objs
-        self.output_objs[obj.name] = np.zeros(obj.info.get_padded_shape())
+        self.output_objs[obj.name] = np.zeros(
+            obj.info.get_padded_shape(), dtype=obj.info.dtype
+        )
 
     def get_input_wr_a(self, obj: Object) -> typing.Optional[isl.Map]:
         return None
@@ -969,15 +1296,16 @@ class DummyGCU:
         """ Write callback for output data
 
         """
-        print("%s: Callback on write: wr_obj:%s wr_idx:%s wr_val:%s"
-             % (self.__class__.__name__, wr_objstr, wr_idx, wr_val))
+        _LOG.debug(
+            "%s: Callback on write: wr_obj:%s wr_idx:%s wr_val:%s",
+            self.__class__.__name__, wr_objstr, wr_idx, wr_val,
+        )
         # if wr_val exsits, and this is an output object, update value
         wr_obj = self.output_objs[wr_objstr]
-        assert isinstance(wr_idx, tuple), "wr_idx (%s) not a tuple" % (wr_idx,)
-        assert len(wr_obj.shape) == len(wr_idx), "wr_obj.shape (%s) has different dimensions that index (%s)" % (wr_obj.shape, wr_idx,)
         if wr_val is not None:
             wr_obj[wr_idx] = wr_val
 
+
 # This is a first implementation of a GCU.
 # It manages input and output buffers:
 #   - sends data from the input buffers to cores
@@ -1016,7 +1344,8 @@ class GCU:
 
     def init_output_object(self, obj: Object, last_loc: typing.Tuple[int, ...]):
         assert obj.name not in self.output_objs
-        self.output_objs[obj.name] = np.zeros(obj.info.get_padded_shape())
+        out = np.zeros(obj.info.get_padded_shape(), dtype=obj.info.dtype)
+        self.output_objs[obj.name] = out
         self.output_objs_last_loc[obj.name] = last_loc
 
     def get_output_object(self, objname):
@@ -1068,17 +1397,20 @@ class GCU:
 
     def write_callback(self, wr_objstr, wr_idx, wr_val):
         """ Write callback for output data """
-        print("%s: Callback on write: wr_obj:%s wr_idx:%s wr_val:%s"
-             % (self.__class__.__name__, wr_objstr, wr_idx, wr_val))
+        _LOG.debug(
+            "%s: Callback on write: wr_obj:%s wr_idx:%s wr_val:%s",
+            self.__class__.__name__, wr_objstr, wr_idx, wr_val,
+        )
         # if wr_val exsits, and this is an output object, update value
         wr_obj = self.output_objs[wr_objstr]
-        assert isinstance(wr_idx, tuple), "wr_idx (%s) not a tuple" % (wr_idx,)
-        assert len(wr_obj.shape) == len(wr_idx), "wr_obj.shape (%s) has different dimensions that index (%s)" % (wr_obj.shape, wr_idx,)
         if wr_val is not None:
             wr_obj[wr_idx] = wr_val
         last_wr_idx = self.output_objs_last_loc.get(wr_objstr, None)
         if wr_idx == last_wr_idx:
-            print("Writing last (%s) index (%s) of object %s" % (last_wr_idx, wr_idx, wr_objstr))
+            _LOG.debug(
+                "Writing last (%s) index (%s) of object %s",
+                last_wr_idx, wr_idx, wr_objstr,
+            )
             self.output_done(wr_objstr)
 
     def output_done(self, objstr: str):
@@ -1104,7 +1436,7 @@ class GCU:
         opid = 0
         while True:
             while len(self.po_queue) == 0:
-                print("GCU: Nothing in the queue")
+                _LOG.debug("GCU: Nothing in the queue")
                 yield
 
             curr = self.po_queue.popleft()
@@ -1130,7 +1462,7 @@ class GCU:
                     # NB: there is a timing issue here that we need to place
                     # the command to the po_queue_input_done queue and then
                     # yield so that its visible to completions
-                    print("GCU: input for op %d done" % (opid,))
+                    _LOG.debug("GCU: input for op %d done", opid)
                     opid += 1
                     self.po_queue_input_done.append(curr)
                     curr = None
@@ -1146,6 +1478,15 @@ class GCU:
             # buffers.
 
 
+# Returned by next() on the tick generator of a stage that is done
+_STAGE_DONE = object()
+
+
+def _drop_write(wr_objstr, wr_idx, wr_val):
+    """ Write callback for objects that nobody consumes """
+    pass
+
+
 class Pipeline:
     """ Pipeline """
 
@@ -1160,6 +1501,8 @@ class Pipeline:
         gcu: GCU = None,
         execute_ops: bool = False,
         loop_inp_limit: typing.Optional[int] = None,
+        write_batch: int = 1,
+        tick_workers: typing.Optional[int] = None,
     ):
         """ Initialize a Pipeline
 
@@ -1167,6 +1510,11 @@ class Pipeline:
         objs_shape: the shapes of the objects accessed in stages.
         gcu: the GCU of the pipeline or None
         execute_ops: actually perform the operations.
+        write_batch: number of iterations whose writes each stage buffers
+          before issuing them (see Stage.tick_gen())
+        tick_workers: if set, tick the stages concurrently on a thread pool
+          with (up to) that many workers. By default, stages are ticked
+          serially.
         """
 
         # Initialize p_objs
@@ -1178,8 +1526,23 @@ class Pipeline:
             raise ValueError(
                 "stages do not have unique names:\n%s" % (pp.pformat(stages))
             )
+        self.execute_ops = execute_ops
+
+        # Stages only see the writes of other stages when they are flushed,
+        # after all stages have ticked. Hence, the stage ticks within a tick
+        # are independent, and can run concurrently. Only the writes buffer
+        # is shared, so it is protected by a lock.
+        nworkers = min(tick_workers or 1, len(stages))
+        if nworkers > 1:
+            self.tick_pool = cf.ThreadPoolExecutor(max_workers=nworkers)
+            self.write_lock = threading.Lock()
+            stage_handle_write = self.handle_write_locked
+        else:
+            self.tick_pool = None
+            self.write_lock = None
+            stage_handle_write = self.handle_write
         for st in stages:
-            st.attach_to_pipeline(self.handle_write, execute_ops)
+            st.attach_to_pipeline(stage_handle_write, execute_ops)
 
         # initialize GCU
         if gcu is None:
@@ -1190,48 +1553,59 @@ class Pipeline:
         # Discover dependencies and build the loc_to_max_iter relation for
         # every writer/reader pair.
         for st in stages:
-            for ro_objname in st.get_ro_objnames():
+            st_name = st.get_name()
+            for ro_objname in st.ro_objnames:
                 if ro_objname not in self.p_objs:
                     raise ValueError(
                         "Object %s read by stage %s, but not provided in initialization"
-                        % (ro_objname, st.get_name())
+                        % (ro_objname, st_name)
                     )
                 obj = self.p_objs[ro_objname]
-                obj.set_reader(st.get_name())
+                obj.set_reader(st_name)
 
-            for wo_objname in st.get_wo_objnames():
+            for wo_objname in st.wo_objnames:
                 if wo_objname not in self.p_objs:
                     raise ValueError(
                         "Object %s written by stage %s, but not provided in initialization"
-                        % (wo_objname, st.get_name())
+                        % (wo_objname, st_name)
                     )
                 obj = self.p_objs[wo_objname]
-                obj.set_writer(st.get_name())
+                obj.set_writer(st_name)
 
-            for rw_objname in st.get_rw_objnames():
+            for rw_objname in st.rw_objnames:
                 if rw_objname not in self.p_objs:
                     raise ValueError(
                         "Object %s is internal to stage %s, but not provided in initialization"
-                        % (rw_objname, st.get_name())
+                        % (rw_objname, st_name)
                     )
                 obj = self.p_objs[rw_objname]
-                obj.set_reader(st.get_name())
-                obj.set_writer(st.get_name())
+                obj.set_reader(st_name)
+                obj.set_writer(st_name)
+
+        # object name -> name of writer stage (None for the GCU)
+        self.writer_of = dict((n, o.writer) for (n, o) in self.p_objs.items())
+
+        # object name -> number of dimensions
+        self.obj_ranks = dict(
+            (n, len(o.info.shape)) for (n, o) in self.p_objs.items()
+        )
 
         # setup stages and allocate objects based on their dependencies
 
         # This is a bit awkward, but we do it to allow the pipeline to work
         # without a GCU. In this case, we call set_dont_wait_for_reads() for
         # input objects and set the objects externally.
+        stage_descs = dict((st.get_name(), []) for st in stages)
         for obj in self.p_objs.values():
             if obj.is_internal():
                 print("Object %s is internal to %s." % (obj.name, obj.reader))
-                reader_stage = self.p_stages[obj.reader]
-                reader_stage.core.alloc_internal_object(obj.name, obj.info)
+                desc = StageObjectDesc(obj.name, obj.info, True, None)
+                stage_descs[obj.reader].append(desc)
 
             elif obj.reader is not None:
                 reader_stage = self.p_stages[obj.reader]
-                reader_stage.core.alloc_object(obj.name, obj.info)
+                desc = StageObjectDesc(obj.name, obj.info, False, None)
+                stage_descs[obj.reader].append(desc)
 
                 if obj.writer is not None:
                     # There is a writer, get the write relation from it
@@ -1246,14 +1620,12 @@ class Pipeline:
                 if wr_a is None:
                     print("Object %s read by %s but written by noone. Assuming it always exists"
                         % (obj.name, obj.reader))
-                    reader_stage.set_dont_wait_for_reads(obj.name)
                 else:
                     print("Object %s written by %s and read by %s"
                         % (obj, obj.writer if obj.writer is not None else "GCU", obj.reader))
                     rd_a = reader_stage.si.get_obj_rd_rel(obj.name)
-                    loc_to_max_iter = isl_rel_loc_to_max_iter(wr_a, rd_a)
-                    reader_stage.set_isl_rel_loc_to_max_iter(
-                        obj.name, loc_to_max_iter
+                    desc.loc_to_max_iter = isl_rel_loc_to_max_iter_shared(
+                        wr_a, rd_a
                     )
 
             elif obj.writer is not None:
@@ -1265,21 +1637,44 @@ class Pipeline:
             else:
                 print("WARNING: object %s is not read or written" % (obj.name,))
 
+        for st in stages:
+            st.configure_objects(stage_descs[st.get_name()])
+
+        # object name -> callback that delivers writes to the object: the
+        # write_callback of its reader stage, or of the GCU for output
+        # objects. Writes to objects that nobody consumes are dropped.
+        self.obj_write_cbs = {}
+        for (n, o) in self.p_objs.items():
+            if o.reader is not None:
+                cb = self.p_stages[o.reader].write_callback
+            elif n in self.p_gcu.output_objs:
+                cb = self.p_gcu.write_callback
+            else:
+                cb = _drop_write
+            self.obj_write_cbs[n] = cb
+
         # Now that we've set loc_to_max_iter, build the python module
         for st in stages:
             st.build_module()
 
         self.loop_inp_limit = loop_inp_limit
-        # Start the generators for every stage
-        self.stage_ticks = dict(
-            ((s, s.tick_gen(self.loop_inp_limit)) for s in stages)
-        )
+        # Start the generators for every stage. tick_fns and tick_names are
+        # parallel lists that only hold the stages that are not done.
+        self.tick_fns = [
+            s.tick_gen(self.loop_inp_limit, write_batch) for s in stages
+        ]
+        self.tick_names = [s.get_name() for s in stages]
+        self.last_tick_fn = self.tick_fns[-1] if stages else None
+        self.build_tick_stages()
+        # Return value of tick() (reused across ticks)
+        self.tick_ret = {}
         # Start the generator for the GCU
         self.gcu_tick = self.p_gcu.tick_gen()
         self.nticks = 0
 
         self.stages = stages
-        # Writes buffer
+        # Buffered writes: (callback, object name, index, value) tuples. The
+        # list is reused across ticks (see flush_writes()).
         self.writes = []
 
     def configure(self, corecnfs: typing.List[CoreConf]):
@@ -1291,30 +1686,42 @@ class Pipeline:
             stage.core.configure(cconf)
 
     def check_writer(self, writer, wr_obj):
-        """ Returns true if the writer is supposed to write wr_obj """
+        """ Asserts that the writer is supposed to write wr_obj """
         if isinstance(writer, Stage):
-            assert writer.get_name() == self.p_objs[wr_obj].writer
+            assert writer.get_name() == self.writer_of[wr_obj]
         elif isinstance(writer, GCU):
-            assert self.p_objs[wr_obj].writer is None
+            assert self.writer_of[wr_obj] is None
         else:
             assert False, "Unknown writer type: %s (%s)" % (type(writer), writer)
 
     def handle_write(self, writer, wr_obj, wr_idx, wr_val):
-        self.check_writer(writer, wr_obj)
-        self.writes.append((wr_obj, wr_idx, wr_val))
+        if __debug__:
+            self.check_writer(writer, wr_obj)
+            assert isinstance(wr_idx, tuple), "wr_idx (%s) not a tuple" % (
+                wr_idx,
+            )
+            assert len(wr_idx) == self.obj_ranks[wr_obj], (
+                "index %s does not match the dimensions of object %s"
+                % (wr_idx, wr_obj)
+            )
+        self.writes.append((self.obj_write_cbs[wr_obj], wr_obj, wr_idx, wr_val))
+
+    def handle_write_locked(self, writer, wr_obj, wr_idx, wr_val):
+        """ handle_write() for stages that tick concurrently """
+        with self.write_lock:
+            self.handle_write(writer, wr_obj, wr_idx, wr_val)
 
     def flush_writes(self):
         """ Actually perform the bufferd writes """
-        for (wr_objstr, wr_idx, wr_val) in self.writes:
-            reader = self.p_objs[wr_objstr].reader
-            if reader is not None:
-                # write data on the reader stage
-                self.p_stages[reader].write_callback(wr_objstr, wr_idx, wr_val)
-            else:
-                # write data on GCU
-                self.p_gcu.write_callback(wr_objstr, wr_idx, wr_val)
-
-        self.writes = []
+        writes = self.writes
+        if not writes:
+            return
+        # write data on the reader stage, or the GCU
+        for (write_cb, wr_obj, wr_idx, wr_val) in writes:
+            write_cb(wr_obj, wr_idx, wr_val)
+        # NB: Write callbacks do not issue writes, so the list can be cleared
+        # (keeping its storage) instead of replaced.
+        writes.clear()
 
     def get_object(self, objstr):
         obj = self.p_objs[objstr]
@@ -1332,36 +1739,113 @@ class Pipeline:
                 raise ValueError("Could not found object %s" % (objstr,))
 
     def tick(self):
-        s = "TICK: %d" % (self.nticks,)
-        # print("="*10, s, "="*(80-10-len(s)-2))
+        """ Execute a single tick on all stages
 
-        ret = {}
+        Returns a dict of stage name -> iteration executed (or None). NB: The
+        same dict is reused (and overwritten) by the next tick.
+        """
+        ret = self.tick_ret
+        ret.clear()
+        self.tick_(ret)
+        return ret
+
+    def tick_(self, ret):
+        """ Execute a single tick on all stages
 
-        stage_keys = list(self.stage_ticks.keys())
-        if len(stage_keys) == 0:
+        ret: dict to store the iteration executed by every stage, or None
+        Returns the iteration executed by the last stage (or None)
+        """
+        _LOG.debug("TICK: %d", self.nticks)
+
+        if len(self.tick_fns) == 0:
             raise StopIteration("No available stages to execute")
 
         if self.gcu_tick is not None:
             next(self.gcu_tick)
 
-        for s in stage_keys:
-            t = self.stage_ticks[s]
-            try:
-                it = next(t)
-                # print("Stage: %s executed iteration %s" % (s.get_name(), it))
-            except StopIteration:
-                # stage done (typically, because we set a limit)
-                print("****** Stage %s done!" % (s.get_name(),))
-                del self.stage_ticks[s]
-                it = None
-
-            ret[s.get_name()] = it
+        last_it = self.tick_stages(ret)
 
-        print("***** All stages ticked. Flushing writes.")
+        _LOG.debug("***** All stages ticked. Flushing writes.")
         self.flush_writes()
         self.nticks += 1
-        print("=" * 80)
-        return ret
+        return last_it
+
+    def build_tick_stages(self):
+        """ Generate self.tick_stages(ret) for the stages that are not done
+
+        The generated function calls next() on the generator of every stage
+        (unrolled), stores the iterations in ret (if not None), and returns
+        the iteration of the last stage. It is regenerated (via stages_done())
+        when a stage is done. For two stages, it looks like:
+
+        def tick_stages(ret):
+            it0 = next(t0, DONE)
+            it1 = next(t1, DONE)
+            if it0 is DONE or it1 is DONE:
+                (it0, it1) = stages_done((it0, it1))
+            if ret is not None:
+                ret[n0] = it0
+                ret[n1] = it1
+            return it1
+
+        If stages are ticked on a thread pool, the next() calls are replaced
+        by:
+            (it0, it1) = pool_map(next, ts, dones)
+        """
+        n = len(self.tick_fns)
+        if n == 0:
+            self.tick_stages = None
+            self.close()
+            return
+
+        glbls = {"DONE": _STAGE_DONE, "stages_done": self.stages_done}
+        its = "".join("it%d, " % (i,) for i in range(n))
+        src = ["def tick_stages(ret):"]
+        for (i, t) in enumerate(self.tick_fns):
+            glbls["t%d" % (i,)] = t
+            glbls["n%d" % (i,)] = self.tick_names[i]
+        if self.tick_pool is not None and n > 1:
+            glbls["pool_map"] = self.tick_pool.map
+            glbls["ts"] = tuple(self.tick_fns)
+            glbls["dones"] = (_STAGE_DONE,) * n
+            src.append("    (%s) = pool_map(next, ts, dones)" % (its,))
+        else:
+            for i in range(n):
+                src.append("    it%d = next(t%d, DONE)" % (i, i))
+        src.append(
+            "    if %s:" % " or ".join("it%d is DONE" % (i,) for i in range(n))
+        )
+        src.append("        (%s) = stages_done((%s))" % (its, its))
+        src.append("    if ret is not None:")
+        for i in range(n):
+            src.append("        ret[n%d] = it%d" % (i, i))
+        last = [
+            i for (i, t) in enumerate(self.tick_fns) if t is self.last_tick_fn
+        ]
+        src.append("    return %s" % ("it%d" % last[0] if last else "None",))
+
+        code = compile("\n".join(src), "<tick_stages>", "exec")
+        exec(code, glbls)
+        self.tick_stages = glbls["tick_stages"]
+
+    def stages_done(self, its):
+        """ Called by tick_stages() when some stages are done
+
+        its: iterations returned by the stage generators (_STAGE_DONE for the
+        stages that are done). Removes the stages that are done and returns
+        the iterations with _STAGE_DONE replaced by None.
+        """
+        live = [it is not _STAGE_DONE for it in its]
+        for (name, is_live) in zip(self.tick_names, live):
+            if not is_live:
+                # stage done (typically, because we set a limit)
+                _LOG.debug("****** Stage %s done!", name)
+        self.tick_fns = list(itertools.compress(self.tick_fns, live))
+        self.tick_names = list(itertools.compress(self.tick_names, live))
+        self.build_tick_stages()
+        return tuple(
+            it if is_live else None for (it, is_live) in zip(its, live)
+        )
 
     def tick_gen(self):
         while True:
@@ -1370,5 +1854,35 @@ class Pipeline:
             except StopIteration:
                 return
 
+    def last_stage_iter_gen(self):
+        """ Tick generator that yields the iteration of the last stage
+
+        The last stage is the last one passed to the Pipeline. The generator
+        yields None on the ticks where the stage did not execute an iteration.
+        """
+        while True:
+            try:
+                yield self.tick_(None)
+            except StopIteration:
+                return
+
+    def run_ticks(self, n: int) -> int:
+        """ Execute (up to) n ticks, without returning per-tick results
+
+        Returns the number of ticks executed (less than n if all stages are
+        done).
+        """
+        nticks = self.nticks
+        deque(itertools.islice(self.last_stage_iter_gen(), n), maxlen=0)
+        return self.nticks - nticks
+
     def append_op(self, op: PipelineOp):
         self.p_gcu.append_op(op)
+
+    def close(self):
+        """ Release the resources of the pipeline (i.e., the tick workers)
+
+        The pipeline cannot be ticked after it is closed.
+        """
+        if self.tick_pool is not None:
+            self.tick_pool.shutdown()
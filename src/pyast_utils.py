@@ -9,6 +9,21 @@ import copy
 import ast as pyast
 
 
+def ast_to_source(node) -> str:
+    """ Return the source code for an AST node (for debugging output)
+
+    Uses ast.unparse() where available (Python >= 3.9), and falls back to
+    astor, which is only imported when needed. ast.unparse() requires
+    complete nodes, so missing locations are filled in @node.
+    """
+    unparse = getattr(pyast, "unparse", None)
+    if unparse is not None:
+        return unparse(pyast.fix_missing_locations(node))
+    import astor
+
+    return astor.to_source(node)
+
+
 class StructureTupleYields(pyast.NodeTransformer):
     """ AST transformer for "structuring" yielded tuples
 
@@ -11,6 +11,7 @@ import itertools
 
 import numpy as np
 import islpy as isl
+import pytest
 
 import pipeline as pl
 from util import xparams, xdict
@@ -20,6 +21,8 @@ from object_info import ObjectInfo
 
 RD_a = pl.IslAccess.RD
 WR_a = pl.IslAccess.WR
+isl_tmpl = pl.IslAccess.template
+isl_spec = pl.IslAccess.specialize
 
 
 def test_mxv():
@@ -53,7 +56,7 @@ def test_mxv():
 
     # Initialize matrix, and create core configuration
     # np.random.seed(666)
-    m_shape = params.eval("(n,n)")
+    m_shape = (params.n, params.n)
     m = np.random.rand(*m_shape)
     cconf = pl.CoreConf(m)
 
@@ -71,27 +74,25 @@ def test_mxv():
     assert np.array_equal(y, np.matmul(m, x))
 
 
+CONV1D_RD = isl_tmpl(
+    "[n,k,p] -> { S1[o1] -> in[j] : 0 <= o1 < ((n - k + 2*p) + 1) and o1 <= j < o1 + k }"
+)
+CONV1D_WR = isl_tmpl(
+    "[n,k,p] -> { S1[o1] -> out[j] : 0 <= o1 < ((n - k + 2*p) + 1) and j = o1 }"
+)
+
+
 def test_conv1d():
     """ Test a single 1D convolution """
     eg_vals = xparams({"n": 10, "k": 3, "p": 1})
 
-    s1_ops = [
-        pl.OpInfo(
-            "MxV",
-            [
-                RD_a(
-                    "[n,k,p] -> { S1[o1] -> in[j] : 0 <= o1 < ((n - k + 2*p) + 1) and o1 <= j < o1 + k }"
-                ),
-                WR_a(
-                    "[n,k,p] -> { S1[o1] -> out[j] : 0 <= o1 < ((n - k + 2*p) + 1) and j = o1 }"
-                ),
-            ],
-        ),
-    ]
+    s1_ops = [pl.OpInfo("MxV", [RD_a(CONV1D_RD), WR_a(CONV1D_WR)])]
     stage1 = pl.Stage(pl.StageInfo(s1_ops), eg_vals)
     objs_info = {
         "in": ObjectInfo(shape=(eg_vals.n,), padding=eg_vals.p),
-        "out": ObjectInfo(shape=eg_vals.eval("(n-k+1,)"), padding=eg_vals.p),
+        "out": ObjectInfo(
+            shape=(eg_vals.n - eg_vals.k + 1,), padding=eg_vals.p
+        ),
     }
     pline = pl.Pipeline([stage1], objs_info, execute_ops=True)
 
@@ -105,7 +106,7 @@ def test_conv1d():
 
     # Set filters
     filters1 = np.random.rand(*conv1_ps.get_filters_shape())
-    filters1_m = filters1.reshape(conv1_ps.eval("(f.l, f.d*f.w)"))
+    filters1_m = filters1.reshape(conv1_ps.get_filters_m_shape())
     cconf = pl.CoreConf(filters1_m)
 
     # Set input
@@ -115,8 +116,7 @@ def test_conv1d():
     inp[...] = image1
 
     pline.configure([cconf])
-    for _ in range(conv1_ps.o.w):
-        pline.tick()
+    pline.run_ticks(conv1_ps.o.w)
     out = pline.get_object("out")
 
     # Verify results
@@ -179,15 +179,15 @@ def test_conv1d_conv1d():
     objs_info = {
         "in1": ObjectInfo(shape=(eg_vals.n,), padding=eg_vals.p),
         "in2": ObjectInfo(
-            shape=(eg_vals.eval("n-k+2*p+1"),), padding=eg_vals.p
+            shape=(eg_vals.n - eg_vals.k + 2 * eg_vals.p + 1,),
+            padding=eg_vals.p,
         ),
     }
     pprint(objs_info)
 
     pline = pl.Pipeline([stage1, stage2], objs_info)
 
-    for i in range(13):
-        pline.tick()
+    pline.run_ticks(13)
 
 
 def test_conv2d():
@@ -211,7 +211,7 @@ def test_conv2d():
 
     # Set filters
     filters1 = np.random.rand(*conv1_ps.get_filters_shape())
-    filters_m = filters1.reshape(conv1_ps.eval("(f.l, f.d*f.h*f.w)"))
+    filters_m = filters1.reshape(conv1_ps.get_filters_m_shape())
     cconf = pl.CoreConf(filters_m)
 
     # Set input
@@ -224,8 +224,8 @@ def test_conv2d():
     p.configure([cconf])
 
     # Execute piepline
-    for _ in range(conv1_ps.o.h * conv1_ps.o.w):
-        p.tick()
+    nticks = conv1_ps.o.h * conv1_ps.o.w
+    assert p.run_ticks(nticks) == nticks
     vals2 = p.get_object("V2")
 
     # Verify results
@@ -274,11 +274,11 @@ def test_conv2d_conv2d():
     p = pl.Pipeline([stage1, stage2], objs_info, execute_ops=True)
 
     filters1 = np.random.rand(*conv1_ps.get_filters_shape())
-    filters_m1 = filters1.reshape(conv1_ps.eval("(f.l, f.d*f.h*f.w)"))
+    filters_m1 = filters1.reshape(conv1_ps.get_filters_m_shape())
     cconf1 = pl.CoreConf(filters_m1)
 
     filters2 = np.random.rand(*conv2_ps.get_filters_shape())
-    filters_m2 = filters2.reshape(conv2_ps.eval("(f.l, f.d*f.h*f.w)"))
+    filters_m2 = filters2.reshape(conv2_ps.get_filters_m_shape())
     cconf2 = pl.CoreConf(filters_m2)
 
     image = np.random.rand(*conv1_ps.get_input_shape())
@@ -291,14 +291,8 @@ def test_conv2d_conv2d():
     pprint(objs_info)
     vals1[...] = image
 
-    while True:
-        iters = p.tick()
-        print("*" * 80)
-        for (s, i) in iters.items():
-            print("%s: %s" % (s, i))
-        print("*" * 80)
-        # input()
-        if iters["S2"] == (0, conv2_ps.o.h - 1, conv2_ps.o.w - 1):
+    for it in p.last_stage_iter_gen():
+        if it == (0, conv2_ps.o.h - 1, conv2_ps.o.w - 1):
             break
 
     vals3 = p.get_object("V3")
@@ -311,6 +305,95 @@ def test_conv2d_conv2d():
     print("DONE!")
 
 
+def run_conv2d_conv2d_small(xbar_dtype=np.float64, rtol=1e-7, **pline_kwargs):
+    """ Run two (small) 2D convolutions, and check the result
+
+    xbar_dtype: dtype of the crossbars
+    rtol: relative tolerance for checking the result
+    pline_kwargs: additional arguments for the Pipeline
+    """
+    conv1_ps = conv.Conv2DParams(
+        i=conv.Conv2DInParams(w=8, h=8, d=2),
+        f=conv.Conv2DFiltParams(w=3, h=3, d=2, l=2),
+        p=1,
+        p_out=1,
+        s=1,
+    )
+
+    conv2_ps = conv.Conv2DParams(
+        i=conv1_ps.o.to_in(),
+        f=conv.Conv2DFiltParams(w=3, h=3, d=conv1_ps.f.l, l=1),
+        p=1,
+        p_out=0,
+        s=1,
+    )
+
+    s1_ops = [OpInfo_CONV(conv1_ps, s_id="S1", vin_id="V1", vout_id="V2")]
+    s2_ops = [OpInfo_CONV(conv2_ps, s_id="S2", vin_id="V2", vout_id="V3")]
+    stage1 = pl.Stage(pl.StageInfo(s1_ops))
+    stage2 = pl.Stage(pl.StageInfo(s2_ops))
+
+    objs_info = {
+        "V1": conv1_ps.get_input_objectinfo(),
+        "V2": conv2_ps.get_input_objectinfo(),
+        "V3": conv2_ps.get_output_objectinfo(),
+    }
+
+    p = pl.Pipeline(
+        [stage1, stage2], objs_info, execute_ops=True, **pline_kwargs
+    )
+
+    filters1 = np.random.rand(*conv1_ps.get_filters_shape())
+    filters2 = np.random.rand(*conv2_ps.get_filters_shape())
+    p.configure(
+        [
+            pl.CoreConf(
+                filters1.reshape(conv1_ps.get_filters_m_shape()), xbar_dtype
+            ),
+            pl.CoreConf(
+                filters2.reshape(conv2_ps.get_filters_m_shape()), xbar_dtype
+            ),
+        ]
+    )
+    assert all(st.core.xbar_m.dtype == xbar_dtype for st in p.stages)
+
+    image = np.random.rand(*conv1_ps.get_input_shape())
+    image = np.pad(image, conv1_ps.get_input_padding())
+    p.get_object("V1")[...] = image
+
+    for _ in p.tick_gen():
+        pass
+    p.close()
+
+    output1 = conv.conv2d_simple(image, filters1, conv1_ps)
+    output1 = np.pad(output1, conv2_ps.get_input_padding())
+    output2 = conv.conv2d_simple(output1, filters2, conv2_ps)
+    np.testing.assert_allclose(output2, p.get_object("V3"), rtol=rtol)
+
+
+def test_conv2d_conv2d_write_batch():
+    # Writes are issued every 5 iterations, or before a stage stalls. Limit
+    # the loop to a single input so that the stages flush their writes.
+    run_conv2d_conv2d_small(loop_inp_limit=1, write_batch=5)
+
+
+def test_write_batch_invalid():
+    stage = pl.Stage(pl.StageInfo([OpInfo_ID((4,), "S1", "V1", "V2")]))
+    objs_info = {"V1": ObjectInfo(shape=(4,)), "V2": ObjectInfo(shape=(4,))}
+    with pytest.raises(ValueError):
+        pl.Pipeline([stage], objs_info, write_batch=0)
+
+
+def test_conv2d_conv2d_tick_workers():
+    run_conv2d_conv2d_small(loop_inp_limit=1, tick_workers=2)
+
+
+def test_conv2d_conv2d_float32_xbar():
+    run_conv2d_conv2d_small(
+        xbar_dtype=np.float32, rtol=1e-5, loop_inp_limit=1
+    )
+
+
 def get_params():
     params = xparams()
     # IN: input size (w/o padding)
@@ -327,6 +410,30 @@ def get_params():
     return params
 
 
+# NB: parameters share names with objects (e.g., O1), which isl is fine with
+RESIDUAL_S1_RD = isl_tmpl(
+    "[O1,F1] -> { S1[s1] -> IN[i1] : 0 <= s1 < O1 and s1 <= i1 < s1 + F1 }"
+)
+RESIDUAL_S1_WR = isl_tmpl(
+    "[O1,P2] -> { S1[s1] -> O1[o1] : 0 <= s1 < O1 and o1 = s1 + P2 }"
+)
+RESIDUAL_S2_MXV_RD = isl_tmpl(
+    "[O3,F2] -> { S2[s2] -> O1[o1] : 0 <= s2 < O3 and s2 <= o1 < s2 + F2 }"
+)
+RESIDUAL_S2_MXV_WR = isl_tmpl(
+    "[O3] -> { S2[s2] -> O3[o3] : 0 <= s2 < O3 and o3 = s2 }"
+)
+RESIDUAL_S2_ADD_RD1 = isl_tmpl(
+    "[O3] -> { S2[s2] -> O1[o1] : 0 <= s2 < O3 and o1 = s2 }"
+)
+RESIDUAL_S2_ADD_RD2 = isl_tmpl(
+    "[O3] -> { S2[s2] -> O3[o3] : 0 <= s2 < O3 and o3 = s2 }"
+)
+RESIDUAL_S2_ADD_WR = isl_tmpl(
+    "[O3] -> { S2[s2] -> OUT[out] : 0 <= s2 < O3 and out = s2 }"
+)
+
+
 def test_residual_1d():
     #  CONV1D ---> CONV1D ---> ADD
     #          |           ^
@@ -362,16 +469,8 @@ def test_residual_1d():
         pl.OpInfo(
             "MxV",
             [
-                RD_a(
-                    "{{ S1[s1] -> IN[i1] : 0 <= s1 < {O1} and s1 <= i1 < s1 + {F1} }}".format(
-                        **params
-                    )
-                ),
-                WR_a(
-                    "{{ S1[s1] -> O1[o1] : 0 <= s1 < {O1} and o1 = s1 + {P2} }}".format(
-                        **params
-                    )
-                ),
+                RD_a(isl_spec(RESIDUAL_S1_RD, params)),
+                WR_a(isl_spec(RESIDUAL_S1_WR, params)),
             ],
         )
     ]
@@ -380,36 +479,16 @@ def test_residual_1d():
         pl.OpInfo(
             "MxV",
             [
-                RD_a(
-                    "{{ S2[s2] -> O1[o1] : 0 <= s2 < {O3} and s2 <= o1 < s2 + {F2}}}".format(
-                        **params
-                    )
-                ),
-                WR_a(
-                    "{{ S2[s2] -> O3[o3] : 0 <= s2 < {O3} and o3 = s2 }}".format(
-                        **params
-                    )
-                ),
+                RD_a(isl_spec(RESIDUAL_S2_MXV_RD, params)),
+                WR_a(isl_spec(RESIDUAL_S2_MXV_WR, params)),
             ],
         ),
         pl.OpInfo(
             "ADD",
             [
-                RD_a(
-                    "{{ S2[s2] -> O1[o1]   : 0 <= s2 < {O3} and o1  = s2 }}".format(
-                        **params
-                    )
-                ),
-                RD_a(
-                    "{{ S2[s2] -> O3[o3]   : 0 <= s2 < {O3} and o3  = s2 }}".format(
-                        **params
-                    )
-                ),
-                WR_a(
-                    "{{ S2[s2] -> OUT[out] : 0 <= s2 < {O3} and out = s2 }}".format(
-                        **params
-                    )
-                ),
+                RD_a(isl_spec(RESIDUAL_S2_ADD_RD1, params)),
+                RD_a(isl_spec(RESIDUAL_S2_ADD_RD2, params)),
+                WR_a(isl_spec(RESIDUAL_S2_ADD_WR, params)),
             ],
         ),
     ]
@@ -455,11 +534,11 @@ def test_residual_1d():
 
     pprint(params)
     filters1 = np.random.rand(*conv1_ps.get_filters_shape())
-    filters1_m = filters1.reshape(conv1_ps.eval("(f.l, f.d*f.w)"))
+    filters1_m = filters1.reshape(conv1_ps.get_filters_m_shape())
     cconf1 = pl.CoreConf(filters1_m)
 
     filters2 = np.random.rand(*conv2_ps.get_filters_shape())
-    filters2_m = filters2.reshape(conv2_ps.eval("(f.l, f.d*f.w)"))
+    filters2_m = filters2.reshape(conv2_ps.get_filters_m_shape())
     cconf2 = pl.CoreConf(filters2_m)
 
     image = np.random.rand(*conv1_ps.get_input_shape())
@@ -496,6 +575,74 @@ def test_residual_1d():
     )
 
 
+def run_residual_1d_float32(image, filters1, filters2, forward):
+    """ Run the test_residual_1d() pipeline with float32 objects
+
+    forward: whether the ADD may use the MxV result directly (see
+      Core.bind_ops()), instead of reading the internal object
+    Returns the OUT object
+    """
+    params = get_params()
+    s1_ops = [
+        pl.OpInfo(
+            "MxV",
+            [
+                RD_a(isl_spec(RESIDUAL_S1_RD, params)),
+                WR_a(isl_spec(RESIDUAL_S1_WR, params)),
+            ],
+        )
+    ]
+    s2_ops = [
+        pl.OpInfo(
+            "MxV",
+            [
+                RD_a(isl_spec(RESIDUAL_S2_MXV_RD, params)),
+                WR_a(isl_spec(RESIDUAL_S2_MXV_WR, params)),
+            ],
+        ),
+        pl.OpInfo(
+            "ADD",
+            [
+                RD_a(isl_spec(RESIDUAL_S2_ADD_RD1, params)),
+                RD_a(isl_spec(RESIDUAL_S2_ADD_RD2, params)),
+                WR_a(isl_spec(RESIDUAL_S2_ADD_WR, params)),
+            ],
+        ),
+    ]
+    s1 = pl.Stage(pl.StageInfo(s1_ops))
+    s2 = pl.Stage(pl.StageInfo(s2_ops))
+
+    f32 = np.float32
+    objs_info = {
+        "IN": ObjectInfo(shape=(params.IN,), padding=params.P1, dtype=f32),
+        "O1": ObjectInfo(shape=(params.O1,), padding=params.P2, dtype=f32),
+        "O3": ObjectInfo(shape=(params.O3,), padding=0, dtype=f32),
+        "OUT": ObjectInfo(shape=(params.OUT,), padding=0, dtype=f32),
+    }
+    pline = pl.Pipeline([s1, s2], objs_info, execute_ops=True, loop_inp_limit=1)
+    (_, add_op) = s2.access_i.ops
+    assert add_op.rd_fwd == [False, True]
+    if not forward:
+        add_op.rd_fwd[:] = [False, False]
+
+    pline.configure([pl.CoreConf(filters1), pl.CoreConf(filters2)])
+    pline.get_object("IN")[...] = image
+    for _ in pline.tick_gen():
+        pass
+    return pline.get_object("OUT")
+
+
+def test_residual_1d_float32_forward():
+    params = get_params()
+    image = np.random.rand(params.IN + 2 * params.P1)
+    filters1 = np.random.rand(1, params.F1)
+    filters2 = np.random.rand(1, params.F2)
+    out_fwd = run_residual_1d_float32(image, filters1, filters2, True)
+    out_nofwd = run_residual_1d_float32(image, filters1, filters2, False)
+    assert out_fwd.dtype == np.float32
+    np.testing.assert_array_equal(out_fwd, out_nofwd)
+
+
 def test_gcu():
     shape = (2, 2, 4)
     objs_info = {
@@ -4,10 +4,9 @@
 #
 # vim: set expandtab softtabstop=4 tabstop=4 shiftwidth=4:
 
-import astor as pyastor
-
 import islpy as isl
 from isl_utils import isl_map_to_ast, isl2py_fn
+from pyast_utils import ast_to_source
 from pipeline import StructureTupleYields
 
 
@@ -20,7 +19,7 @@ def test_structure_yields():
         rel.space.dim(x) for x in (isl.dim_type.in_, isl.dim_type.out)
     )
     py = isl2py_fn(rel_ast, "foo")
-    print("Before:\n", pyastor.to_source(py))
+    print("Before:\n", ast_to_source(py))
     StructureTupleYields(structure).visit(py)
-    print("After:\n", pyastor.to_source(py))
+    print("After:\n", ast_to_source(py))
     # TODO: actually check the generated i
@@ -3,8 +3,8 @@ import ast as pyast
 from pprint import pprint
 
 import islpy as isl
-import astor as pyastor
 
+from pyast_utils import ast_to_source
 from pipeline import isl_map_to_pyfn
 
 ## Original  code for reference
@@ -42,8 +42,8 @@ print(prod)
 body = []
 py = isl_map_to_pyfn(prod, "fn")
 body.append(py)
-ast_mod = pyast.Module(body=body)
-print(pyastor.to_source(ast_mod))
+ast_mod = pyast.Module(body=body, type_ignores=[])
+print(ast_to_source(ast_mod))
 
 pyast.fix_missing_locations(ast_mod)
 code = compile(ast_mod, "<generated>", "exec")
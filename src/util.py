@@ -6,6 +6,7 @@
 
 """ Misc utilities """
 
+import functools
 import typeguard
 import typing
 
@@ -18,10 +19,16 @@ class xdict(dict):
     __delattr__ = dict.__delitem__
 
 
+@functools.lru_cache(maxsize=None)
+def compile_expr(expr: str):
+    """ Compile an expression (cached, so that it is compiled only once) """
+    return compile(expr, "<expr>", "eval")
+
+
 class xparams(xdict):
     def eval(self, expr):
         """ Evaluate an expression with the parameters """
-        return eval(expr, None, self)
+        return eval(compile_expr(expr), None, self)
 
     def compute(self, p, expr):
         """ set a parameter based on an expression"""